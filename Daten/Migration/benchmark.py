@@ -0,0 +1,133 @@
+# Benchmark und Golden-Output-Vergleich für den Dekodier-Pfad (json2df), läuft komplett offline
+#
+#   python Daten/Migration/benchmark.py                   # messen + mit letztem Lauf und golden.json vergleichen
+#   python Daten/Migration/benchmark.py --update-golden   # Prüfsummen nach gewollter Ausgabeänderung neu einfrieren
+#
+# Je *_data.json: Laufzeit (bestes von --repeat Läufen, ohne Cache), Spitzen-Speicher (tracemalloc), Zeilen/s.
+# Golden: SHA-256 der CSV, die build.py je Rezept erzeugen würde, gegen golden.json.
+import argparse
+import gc
+import hashlib
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import destasis
+from destasis import json2df
+from build import RECIPES, _frame, _recipe_key
+
+BASE_PATH = Path(__file__).parent
+GOLDEN_FILE = BASE_PATH / "golden.json"
+RESULTS_FILE = destasis.CACHE_DIR / "benchmark.json"
+
+
+def run(repeat=3):
+    results = {}
+    for path in sorted(BASE_PATH.glob("*_data.json")):
+        stat = path.name[:-len("_data.json")]
+        if not (BASE_PATH / f"{stat}_structure.json").exists():
+            continue
+
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            df = json2df(stat, cache=False)
+            times.append(time.perf_counter() - start)
+            del df
+
+        # Speicher getrennt messen, tracemalloc verlangsamt die Laufzeit
+        gc.collect()
+        tracemalloc.start()
+        rows = len(json2df(stat, cache=False))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        seconds = min(times)
+        results[stat] = {
+            "seconds": seconds,
+            "peak_mb": peak / 1e6,
+            "rows": rows,
+            "rows_per_s": rows / seconds,
+        }
+    return results
+
+
+# Prüfsummen der abgeleiteten CSVs (wie build.py sie schreiben würde)
+# Ohne Cache dekodieren, sonst würden veraltete .cache-Dateien verglichen
+def checksums():
+    sums = {}
+    for name, recipe in RECIPES.items():
+        if _recipe_key(name) is None:
+            continue
+        csv = _frame(recipe, cache=False).to_csv()
+        sums[name] = hashlib.sha256(csv.encode("utf8")).hexdigest()
+    return sums
+
+
+def _delta(new, old):
+    if not old:
+        return ""
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark und Golden-Output-Vergleich für json2df")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen je Tabelle (bestes Ergebnis zählt)")
+    parser.add_argument("--update-golden", action="store_true", help="golden.json mit der aktuellen Ausgabe überschreiben")
+    args = parser.parse_args()
+
+    previous = {}
+    if RESULTS_FILE.exists():
+        with open(RESULTS_FILE, encoding="utf8") as f:
+            previous = json.load(f)
+
+    results = run(args.repeat)
+
+    print(f"{'Tabelle':32} {'Zeit':>9} {'Δ':>7} {'Speicher':>10} {'Δ':>7} {'Zeilen/s':>12} {'Δ':>7}")
+    for stat, r in results.items():
+        p = previous.get(stat, {})
+        print(
+            f"{stat:32} {r['seconds'] * 1000:7.1f}ms {_delta(r['seconds'], p.get('seconds')):>7} "
+            f"{r['peak_mb']:8.1f}MB {_delta(r['peak_mb'], p.get('peak_mb')):>7} "
+            f"{r['rows_per_s']:12,.0f} {_delta(r['rows_per_s'], p.get('rows_per_s')):>7}"
+        )
+
+    RESULTS_FILE.parent.mkdir(exist_ok=True)
+    with open(RESULTS_FILE, "w", encoding="utf8") as f:
+        json.dump(results, f, indent=1)
+
+    sums = checksums()
+    golden = {}
+    if GOLDEN_FILE.exists():
+        with open(GOLDEN_FILE, encoding="utf8") as f:
+            golden = json.load(f)
+
+    if args.update_golden:
+        # Ausgaben ohne Quelldatei behalten ihre bisherige Prüfsumme
+        sums = {name: sums.get(name, golden.get(name)) for name in RECIPES if name in sums or name in golden}
+        with open(GOLDEN_FILE, "w", encoding="utf8") as f:
+            json.dump(sums, f, indent=1, ensure_ascii=False)
+            f.write("\n")
+        print(f"\n{GOLDEN_FILE.name} aktualisiert ({len(sums)} Ausgaben)")
+        return 0
+
+    print()
+    failed = 0
+    for name, expected in golden.items():
+        actual = sums.get(name)
+        if actual is None:
+            status = "übersprungen (Quelldatei fehlt)"
+        elif actual == expected:
+            status = "ok"
+        else:
+            status = "ABWEICHUNG"
+            failed += 1
+        print(f"{name:32} {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+# Erzeugt die Dateien in Streamlit/data/migration aus den GENESIS-JSON-Dateien in Daten/Migration
+# (je Ausgabe eine CSV und eine spaltenorientierte .feather-Datei für die Streamlit-Seiten)
+# (ersetzt das Ausführen von Historisch.ipynb, Alter.ipynb, Alter_de.ipynb, Einbürgerung_Wanderung.ipynb)
+#
+#   python Daten/Migration/build.py                     # nur geänderte Ausgaben neu bauen
+#   python Daten/Migration/build.py --force             # alles neu bauen
+#   python Daten/Migration/build.py alterspyramide.csv  # einzelne Ausgaben
+#   python Daten/Migration/build.py --append            # nur neue Stichtage/Jahre anhängen
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import destasis
+from cube import Cube
+from destasis import json2df, read_jsonstat
+
+BASE_PATH = Path(__file__).parent
+OUT_DIR = BASE_PATH.parent.parent / "Streamlit" / "data" / "migration"
+STATE_FILE = destasis.CACHE_DIR / "build_state.json"
+# Erhöhen, wenn sich die Logik in _build ändert
+_BUILD_VERSION = 2
+
+
+# Umcodierungen von Codes, werden je eindeutigem Wert einmal ausgewertet (nicht je Zeile)
+MAPPINGS = {
+    # Bei den Deutschen geht es nur bis 85, daher wird das bei den Ausländern auch gekürzt
+    "alter_bis_85": lambda alt: min(int(alt[3:6]), 85),
+    "alter": lambda alt: int(alt[3:6]),
+}
+
+
+# Rezepte je Ausgabedatei:
+#   source:   GENESIS-Tabelle (Dateien <source>_data.json / <source>_structure.json)
+#   include/exclude: Filter auf Codes wie bei json2df (werden vor dem Dekodieren angewendet)
+#   derive:   {neue Spalte: [Quellspalte, Name in MAPPINGS]}
+#   rename:   {alte Spalte: neue Spalte}
+#   groupby:  Summe von "Value" je Gruppe, sonst columns: Spaltenauswahl
+#   append:   [Dimension, Spalte] - neue Werte dieser Dimension werden bei --append nur angehängt
+#             (nur wenn die Dimension als Spalte bzw. Gruppe in der Ausgabe steht)
+#   compression: Kompression der Feather-Datei (z.B. "zstd" für große Tabellen), Standard unkomprimiert
+#   cube:     Spalten, über die die Ausgabe zusätzlich als dichter Cube (cube.py) gespeichert wird
+#             (<name>.npy + .json, fehlende Kombinationen = 0); die App öffnet ihn memory-mapped
+RECIPES = {
+    "historisch_gesamt.csv": {
+        "source": "12411-0002_historisch",
+        "columns": ["STAG", "Nationalität", "Value"],
+        "append": ["STAG", "STAG"],
+    },
+    "historisch_ländergruppen.csv": {
+        "source": "12521-0002_historisch",
+        "include": {"GES": "%TOTAL%"},
+        "columns": ["STAG", "Ländergruppierungen", "Value"],
+        "append": ["STAG", "STAG"],
+    },
+    "historisch_staaten.csv": {
+        "source": "12521-0002_historisch_staat",
+        "include": {"GES": "%TOTAL%"},
+        "exclude": {"STAAG6": "%TOTAL%"},
+        "columns": ["STAG", "Staatsangehörigkeit", "Value"],
+        "append": ["STAG", "STAG"],
+    },
+    "historisch_titel.csv": {
+        "source": "12521-0008_Titel_Länder",
+        "include": {"LDRGR1": ["DRITT-EU-28", "EUROPA-EU-28"]},
+        "exclude": {"RECGL3": "REC-AE-08"},
+        "groupby": ["STAG", "Ausgewählte Aufenthaltstitel"],
+        "append": ["STAG", "STAG"],
+    },
+    "alterspyramide.csv": {
+        "source": "12521-0003_Alter",
+        "include": {"STAG": "2024-12-31"},
+        "exclude": {"GES": "%TOTAL%", "ALT102": "ALTNN"},
+        "derive": {"ALT": ["ALT102", "alter_bis_85"]},
+        "groupby": ["Ländergruppierungen", "GES", "ALT"],
+        "cube": ["Ländergruppierungen", "GES", "ALT"],
+    },
+    # Alle Stichtage und Alter bis 95 (95 = 95 und älter) für Altersauswertungen und die animierte Pyramide
+    "alter_stichtage.csv": {
+        "source": "12521-0003_Alter",
+        "exclude": {"GES": "%TOTAL%", "ALT102": "ALTNN"},
+        "derive": {"ALT": ["ALT102", "alter"]},
+        "groupby": ["STAG", "Ländergruppierungen", "GES", "ALT"],
+        "append": ["STAG", "STAG"],
+        "cube": ["Ländergruppierungen", "STAG", "GES", "ALT"],
+        # 0,6 statt 7,2 MB; die CSV wird nicht eingecheckt (.gitignore), die App liest sie nicht
+        "compression": "zstd",
+    },
+    "alterspyramide_de.csv": {
+        "source": "12411-0007_Alter_de",
+        "include": {"STAG": "2023-12-31", "NAT": "NATD"},
+        "exclude": {"GES": "%TOTAL%", "ALT013": "%TOTAL%"},
+        "derive": {"ALT": ["ALT013", "alter"]},
+        "columns": ["GES", "ALT", "Value"],
+        "cube": ["GES", "ALT"],
+    },
+    "einbürg_ländergruppen.csv": {
+        "source": "12511-0006",
+        "include": {"GES": "%TOTAL%"},
+        "groupby": ["Jahr", "Ländergruppierungen"],
+        "append": ["JAHR", "Jahr"],
+    },
+    "einbürg_recht.csv": {
+        "source": "12511-0006",
+        "include": {"GES": "%TOTAL%", "LDRGR1": "%TOTAL%"},
+        "groupby": ["Jahr", "Rechtsgrundlagen"],
+        "append": ["JAHR", "Jahr"],
+    },
+    "einbürg_gesamt.csv": {
+        "source": "12511-0006",
+        "include": {"GES": "%TOTAL%", "LDRGR1": "%TOTAL%"},
+        "rename": {"Ländergruppierungen": "Staatsangehörigkeit"},
+        "groupby": ["Jahr", "Staatsangehörigkeit"],
+        "append": ["JAHR", "Jahr"],
+    },
+    # 12511-0006_staat_data.json (nach Staatsangehörigkeit) liegt nicht im Repository
+    "einbürg_staaten.csv": {
+        "source": "12511-0006_staat",
+        "include": {"GES": "%TOTAL%"},
+        "exclude": {"STAAG6": "%TOTAL%"},
+        "groupby": ["Jahr", "Staatsangehörigkeit"],
+        "append": ["JAHR", "Jahr"],
+    },
+    "wander_staaten.csv": {
+        "source": "12711-0008",
+        "include": {"NAT": "NATA", "content": "BEV012"},
+        "exclude": {"HZLDR1": "%TOTAL%"},
+        "groupby": ["Jahr", "Herkunfts-/Zielländer"],
+        "append": ["JAHR", "Jahr"],
+    },
+    "wander_gesamt.csv": {
+        "source": "12711-0008",
+        "include": {"NAT": "NATA", "HZLDR1": "%TOTAL%"},
+        "rename": {"content_desc": "Art"},
+        "groupby": ["Jahr", "Art"],
+        "append": ["JAHR", "Jahr"],
+    },
+    "wander_gesamt_de.csv": {
+        "source": "12711-0008",
+        "include": {"NAT": "NATD", "HZLDR1": "%TOTAL%"},
+        "rename": {"content_desc": "Art"},
+        "groupby": ["Jahr", "Art"],
+        "append": ["JAHR", "Jahr"],
+    },
+}
+
+
+# Baut die angegebenen (bzw. alle) Ausgaben parallel; unveränderte werden übersprungen
+# append=True: bei Ausgaben mit "append" nur die neuen Werte der Zeit-Dimension dekodieren und anhängen,
+# die vorhandenen Zeilen bleiben unverändert (Korrekturen älterer Werte werden dabei nicht übernommen);
+# hat sich seit dem letzten Lauf das Rezept geändert, wird stattdessen neu gebaut
+def build(names=None, force=False, jobs=None, append=False):
+    names = names or list(RECIPES)
+    unknown = set(names) - set(RECIPES)
+    if unknown:
+        raise KeyError(f"Unbekannte Ausgabe(n): {sorted(unknown)}")
+
+    state = _read_state()
+    results, todo = {}, {}
+    for name in names:
+        key = _recipe_key(name)
+        exists = all(path.exists() for path in _outputs(name))
+        if key is None:
+            results[name] = "übersprungen (Quelldatei fehlt)"
+        elif not force and state.get(name) == key and exists:
+            results[name] = "aktuell"
+        elif append and exists and "append" in RECIPES[name] and _same_logic(state.get(name), key):
+            todo[name] = (key, _append)
+        else:
+            todo[name] = (key, _build)
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(worker, name): name for name, (_, worker) in todo.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    rows, seconds = future.result()
+                except Exception as e:
+                    results[name] = f"FEHLER: {e!r}"
+                    continue
+                state[name] = todo[name][0]
+                action = "angehängt" if todo[name][1] is _append else "gebaut"
+                results[name] = f"{action} ({rows} Zeilen, {seconds:.2f}s)"
+        _write_state(state)
+
+    return {name: results[name] for name in names}
+
+
+# Eine Ausgabe bauen und schreiben (läuft im Worker-Prozess)
+def _build(name):
+    start = time.perf_counter()
+    recipe = RECIPES[name]
+    df = _frame(recipe)
+    _write_csv(df, OUT_DIR / name)
+    _write_feather(df, _feather_path(name), recipe.get("compression"))
+    if "cube" in recipe:
+        _write_cube(df, recipe["cube"], _cube_path(name))
+    _mirror(name)
+    return len(df), time.perf_counter() - start
+
+
+# Nur neue Werte der Zeit-Dimension dekodieren und an die vorhandene Ausgabe anhängen (Worker-Prozess)
+# Ergebnis ist Zeile für Zeile wie beim Neubau: ohne groupby behalten die Zeilen den Index aus json2df und
+# stehen danach sortiert; mit groupby ist die Zeit-Spalte der erste Schlüssel, die Zeilen stehen also nach ihr
+# sortiert und werden wie bei reset_index fortlaufend nummeriert
+def _append(name):
+    start = time.perf_counter()
+    recipe = RECIPES[name]
+    dim, col = recipe["append"]
+    path = OUT_DIR / name
+
+    # Vorhandene Ausgabe als Text lesen, damit sie unverändert zurückgeschrieben wird
+    stored = pd.read_csv(path, index_col=0, dtype=str, keep_default_na=False)
+    stored.index = stored.index.astype("int64")
+    known = set(stored[col])
+    new = [code for code, value in _axis_values(recipe["source"], dim, col) if value not in known]
+    if not new:
+        return 0, time.perf_counter() - start
+
+    df = _frame(recipe, {dim: new})
+    combined = pd.concat([stored, df.astype(str)])
+    if "groupby" in recipe:
+        combined = combined.sort_values(col, kind="stable").reset_index(drop=True)
+    else:
+        combined = combined.sort_index(kind="stable")
+    _write_csv(combined, path)
+    # Feather und Cube können nicht angehängt werden -> aus der vollständigen CSV neu schreiben
+    full = pd.read_csv(path, index_col=0)
+    _write_feather(full, _feather_path(name), recipe.get("compression"))
+    if "cube" in recipe:
+        _write_cube(full, recipe["cube"], _cube_path(name))
+    _mirror(name)
+    return len(df), time.perf_counter() - start
+
+
+# Rezept anwenden (include_extra: zusätzliche Filter, z.B. nur neue Stichtage; cache: wie bei json2df)
+def _frame(recipe, include_extra=None, cache=True):
+    include = {**recipe.get("include", {}), **(include_extra or {})}
+    df = json2df(recipe["source"], include=include, exclude=recipe.get("exclude"), cache=cache)
+    for col, (src, mapping) in recipe.get("derive", {}).items():
+        df[col] = _map_unique(df[src], MAPPINGS[mapping])
+    df = df.rename(columns=recipe.get("rename", {}))
+
+    if "groupby" in recipe:
+        return df.groupby(recipe["groupby"])["Value"].sum().reset_index()
+    return df[recipe["columns"]]
+
+
+# (Code, Wert in der Ausgabe) je Wert der Dimension, nur aus dem Kopf der Daten-JSON
+# Steht in der Ausgabe die Label-Spalte (z.B. "Jahr" statt "JAHR"), wird das deutsche Label verglichen
+def _axis_values(source, dim, col):
+    header, _ = read_jsonstat(BASE_PATH / f"{source}_data.json", values=False)
+    codes = list(header["dimension"][dim]["category"]["index"])
+    if col == dim:
+        return [(code, code) for code in codes]
+    structure = destasis._structure(BASE_PATH / f"{source}_structure.json")
+    return [(code, destasis._label(structure, dim, code)["de"]) for code in codes]
+
+
+# vorhandene Kopien in Daten/Migration mit aktualisieren
+def _mirror(name):
+    if (BASE_PATH / name).exists():
+        shutil.copyfile(OUT_DIR / name, BASE_PATH / name)
+
+
+def _map_unique(series, func):
+    uniques = series.unique()
+    return series.map(dict(zip(uniques, map(func, uniques))))
+
+
+def _write_csv(df, path):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    df.to_csv(tmp)
+    os.replace(tmp, path)
+
+
+def _feather_path(name):
+    return (OUT_DIR / name).with_suffix(".feather")
+
+
+# Pfad ohne Endung, Cube.save/Cube.open hängen .npy und .json an
+def _cube_path(name):
+    return (OUT_DIR / name).with_suffix("")
+
+
+# Alle Dateien, die eine Ausgabe erzeugt
+def _outputs(name):
+    paths = [OUT_DIR / name, _feather_path(name)]
+    if "cube" in RECIPES[name]:
+        paths += [_cube_path(name).with_suffix(".npy"), _cube_path(name).with_suffix(".json")]
+    return paths
+
+
+# Spaltenorientierte Kopie: Text-Spalten dictionary-kodiert (Categorical), Stichtag als Datum + Ganzzahl "Jahr"
+# Standard unkomprimiert, damit die Datei beim Lesen memory-mapped werden kann; komprimierte Dateien
+# entpackt pyarrow beim Lesen
+def _write_feather(df, path, compression=None):
+    df = df.reset_index(drop=True)
+    if "STAG" in df.columns:
+        df["STAG"] = pd.to_datetime(df["STAG"], format="%Y-%m-%d")
+        df["Jahr"] = df["STAG"].dt.year
+    if "Jahr" in df.columns:
+        df["Jahr"] = df["Jahr"].astype("int64")
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype("category")
+
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    df.to_feather(tmp, compression=compression or "uncompressed")
+    os.replace(tmp, path)
+
+
+# Summe von "Value" als dichter Cube über dims, Achsen in der Reihenfolge des ersten Auftretens
+# int32, wenn die Werte hineinpassen (halbe Dateigröße), sonst int64
+def _write_cube(df, dims, path):
+    pos, codes = [], {}
+    for dim in dims:
+        p, uniques = pd.factorize(df[dim], sort=False)
+        pos.append(p)
+        codes[dim] = uniques.tolist()
+
+    values = np.zeros([len(codes[dim]) for dim in dims], dtype=np.int64)
+    np.add.at(values, tuple(pos), df["Value"].to_numpy())
+    if values.size and values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max:
+        values = values.astype(np.int32)
+
+    tmp = path.with_name(f"{path.name}_{os.getpid()}_tmp")
+    Cube(values, dims, codes).save(tmp)
+    for suffix in (".npy", ".json"):
+        os.replace(tmp.with_suffix(suffix), path.with_suffix(suffix))
+
+
+# Schlüssel "<Logik>:<Quelle>" (None = Quelle fehlt)
+# Logik: Rezept und verwendete Umcodierungen, Quelle: Inhalt der Quelldateien
+def _recipe_key(name):
+    recipe = RECIPES[name]
+    files = [BASE_PATH / f"{recipe['source']}_{part}.json" for part in ("data", "structure")]
+    if not all(f.exists() for f in files):
+        return None
+
+    mappings = [inspect.getsource(MAPPINGS[m]).strip() for _, m in recipe.get("derive", {}).values()]
+    logic = _hash([_BUILD_VERSION, destasis._CACHE_VERSION, recipe, mappings])
+    return f"{logic}:{_hash([destasis._file_hash(f) for f in files])}"
+
+
+# Anhängen nur, wenn sich seit dem letzten Lauf allein die Quelle geändert hat; bei geändertem Rezept
+# (Filter, derive, rename, ...) passen die vorhandenen Zeilen nicht mehr -> neu bauen
+def _same_logic(old_key, key):
+    return old_key is not None and old_key.split(":")[0] == key.split(":")[0]
+
+
+def _hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _read_state():
+    if STATE_FILE.exists():
+        with open(STATE_FILE, encoding="utf8") as f:
+            return json.load(f)
+    return {}
+
+
+def _write_state(state):
+    STATE_FILE.parent.mkdir(exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf8") as f:
+        json.dump(state, f, indent=1, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Baut Streamlit/data/migration aus den GENESIS-JSON-Dateien")
+    parser.add_argument("names", nargs="*", help="Ausgabedateien (Standard: alle)")
+    parser.add_argument("--force", action="store_true", help="auch unveränderte Ausgaben neu bauen")
+    parser.add_argument("--append", action="store_true", help="nur neue Stichtage/Jahre anhängen")
+    parser.add_argument("--jobs", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = build(args.names, args.force, args.jobs, args.append)
+    for name, result in results.items():
+        print(f"{name:32} {result}")
+    print(f"Fertig in {time.perf_counter() - start:.2f}s")
+    sys.exit(1 if any(r.startswith("FEHLER") for r in results.values()) else 0)
@@ -0,0 +1,188 @@
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+
+# Beschrifteter N-dimensionaler Datenwürfel (z.B. GES × STAG × LDRGR1 × ALT102)
+# values: Numpy-Array (auch memory-mapped), je Dimension ein Code- und ein Label-Array
+# titles: Spaltenname der Label-Spalte je Dimension (wie in json2df, z.B. "Ländergruppierungen")
+# Ohne labels/titles (nur Codes) werden die Codes bzw. Dimensionsnamen verwendet
+class Cube:
+    def __init__(self, values, dims, codes, labels=None, titles=None):
+        self.values = values
+        self.dims = list(dims)
+        self.codes = {d: np.asarray(codes[d], dtype=object) for d in self.dims}
+        self.labels = {d: np.asarray(labels[d], dtype=object) for d in self.dims} if labels else self.codes
+        self.titles = {d: titles[d] for d in self.dims} if titles else {d: d for d in self.dims}
+
+        expected = tuple(len(self.codes[d]) for d in self.dims)
+        if self.values.shape != expected:
+            raise ValueError(f"Form {self.values.shape} passt nicht zu den Achsen {expected}")
+
+    def __repr__(self):
+        axes = ", ".join(f"{d}={n}" for d, n in zip(self.dims, self.shape))
+        return f"Cube({axes})"
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def axis(self, dim):
+        if dim not in self.dims:
+            raise KeyError(f"Unbekannte Dimension: {dim}")
+        return self.dims.index(dim)
+
+    # Auswahl über Codes (by="code") oder Labels (by="label"), Syntax wie bei json2df
+    # Zusammenhängende Auswahlen bleiben Views (auch auf memory-mapped Daten)
+    def sel(self, include=None, exclude=None, by="code"):
+        if by not in ("code", "label"):
+            raise ValueError(f"by muss 'code' oder 'label' sein, nicht {by!r}")
+        axes = self.codes if by == "code" else self.labels
+        pos = _positions(self.dims, [axes[d] for d in self.dims], include, exclude)
+        if pos is None:
+            return self
+
+        slices = [_as_slice(p) for p in pos]
+        if all(s is not None for s in slices):
+            values = self.values[tuple(slices)]
+        else:
+            values = self.values[np.ix_(*pos)]
+
+        return Cube(
+            values,
+            self.dims,
+            {d: self.codes[d][p] for d, p in zip(self.dims, pos)},
+            {d: self.labels[d][p] for d, p in zip(self.dims, pos)},
+            self.titles,
+        )
+
+    def sum(self, dims):
+        return self._reduce(np.sum, dims)
+
+    def mean(self, dims):
+        return self._reduce(np.mean, dims)
+
+    def _reduce(self, func, dims):
+        dims = [dims] if isinstance(dims, str) else list(dims)
+        axes = tuple(self.axis(d) for d in dims)
+        keep = [d for d in self.dims if d not in dims]
+        return Cube(np.asarray(func(self.values, axis=axes)), keep, self.codes, self.labels, self.titles)
+
+    # Dimensionen mit nur einem Wert entfernen
+    def squeeze(self):
+        keep = [d for d, n in zip(self.dims, self.shape) if n != 1]
+        values = self.values.reshape([len(self.codes[d]) for d in keep])
+        return Cube(values, keep, self.codes, self.labels, self.titles)
+
+    def astype(self, dtype):
+        return Cube(self.values.astype(dtype), self.dims, self.codes, self.labels, self.titles)
+
+    # Anteil der Zellen ungleich 0
+    @property
+    def density(self):
+        return np.count_nonzero(self.values) / max(self.values.size, 1)
+
+    # Lange Tabelle wie json2df: Code- und Label-Spalte je Dimension + "Value"
+    # labels=False: nur kategorische Code-Spalten (Ganzzahl-Codes, Labels später über destasis.Labels)
+    # sparse=True: nur Zellen ungleich 0 (Koordinatenform), Summen/Gruppierungen bleiben gleich
+    # index: Zeilen-Index je Zelle (Standard: 0..n-1, bei sparse die Zellennummer)
+    # Zeilen in C-Reihenfolge: Index je Dimension = Achsen-Index wiederholt (innere) und gekachelt (äußere Dimensionen)
+    def to_frame(self, labels=True, sparse=False, index=None):
+        shape = self.shape
+        values = np.ravel(self.values)
+        if sparse:
+            keep = np.flatnonzero(values)
+            values = values[keep]
+            coords = np.unravel_index(keep, shape)
+            index = keep if index is None else np.asarray(index)[keep]
+
+        columns, names = [], []
+        for i, d in enumerate(self.dims):
+            if sparse:
+                idx = coords[i].astype(_index_dtype(shape[i]))
+            else:
+                inner = int(np.prod(shape[i + 1:], dtype=np.int64))
+                outer = int(np.prod(shape[:i], dtype=np.int64))
+                idx = np.tile(np.repeat(np.arange(shape[i], dtype=_index_dtype(shape[i])), inner), outer)
+
+            if labels:
+                columns.append(np.take(self.codes[d], idx))
+                columns.append(np.take(self.labels[d], idx))
+                names += [d, self.titles[d]]
+            else:
+                columns.append(pd.Categorical.from_codes(idx, categories=self.codes[d]))
+                names.append(d)
+
+        columns.append(values)
+        names.append("Value")
+
+        df = pd.DataFrame(dict(enumerate(columns)))
+        df.columns = names
+        if index is not None:
+            df.index = index
+        return df
+
+    # Speichern als <path>.npy (Werte) + <path>.json (Achsen)
+    def save(self, path):
+        path = Path(path)
+        np.save(path.with_suffix(".npy"), np.ascontiguousarray(self.values))
+        manifest = {
+            "dims": self.dims,
+            "titles": self.titles,
+            "codes": {d: self.codes[d].tolist() for d in self.dims},
+            "labels": {d: self.labels[d].tolist() for d in self.dims},
+        }
+        with open(path.with_suffix(".json"), "w", encoding="utf8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+    # Öffnet einen gespeicherten Würfel, standardmäßig memory-mapped (nur gelesene Teile werden geladen)
+    @classmethod
+    def open(cls, path, mmap=True):
+        path = Path(path)
+        with open(path.with_suffix(".json"), encoding="utf8") as f:
+            manifest = json.load(f)
+        values = np.load(path.with_suffix(".npy"), mmap_mode="r" if mmap else None)
+        return cls(values, manifest["dims"], manifest["codes"], manifest["labels"], manifest["titles"])
+
+
+# Positionen je Achse, die nach include/exclude übrig bleiben (None = kein Filter)
+def _positions(dims, axis_codes, include=None, exclude=None):
+    include = include or {}
+    exclude = exclude or {}
+    unknown = (set(include) | set(exclude)) - set(dims)
+    if unknown:
+        raise KeyError(f"Unbekannte Dimension(en): {sorted(unknown)}")
+    if not include and not exclude:
+        return None
+
+    pos = []
+    for cat, codes in zip(dims, axis_codes):
+        mask = np.ones(len(codes), dtype=bool)
+        if cat in include:
+            mask &= np.isin(codes, _as_list(include[cat]))
+        if cat in exclude:
+            mask &= ~np.isin(codes, _as_list(exclude[cat]))
+        pos.append(np.flatnonzero(mask))
+    return pos
+
+
+def _as_list(codes):
+    if isinstance(codes, str):
+        return [codes]
+    return list(codes)
+
+
+# Zusammenhängende Positionen als slice (View statt Kopie), sonst None
+def _as_slice(pos):
+    if len(pos) and pos[-1] - pos[0] + 1 == len(pos):
+        return slice(int(pos[0]), int(pos[-1]) + 1)
+    return None
+
+
+# Kleinster Ganzzahltyp für Achsen-Indizes (wie bei pandas-Categoricals)
+def _index_dtype(n):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
@@ -1,62 +1,395 @@
+import hashlib
 import json
+import os
+import re
+from collections import defaultdict
 import numpy as np
 import pandas as pd
 from pathlib import Path
+from cube import Cube, _as_list, _positions
+
+# Zwischenspeicher für dekodierte Tabellen (Feather), Schlüssel = Inhalt der JSON-Dateien + Parameter
+CACHE_DIR = Path(__file__).parent / ".cache"
+# Erhöhen, wenn sich die Ausgabe des Dekoders ändert (macht alte Cache-Dateien ungültig)
+_CACHE_VERSION = 2
+
+_INDEX = "__index__"
+_HASHES = {}
+_STRUCTURES = {}
+
 
 # Erstellt aus den Destasis-JSON-Daten ein Pandas Dataframe
-def json2df(stat, lng="de"):
-    base_path = Path(__file__).parent.parent.parent / "Daten" / "Migration"
+# include/exclude: {Dimension: Code(s)}, z.B. include={"STAG": "2024-12-31"}, exclude={"GES": "%TOTAL%"}
+# Gefilterte Zeilen behalten ihren Index aus der ungefilterten Tabelle
+# sparse=True: nur Zeilen mit Wert ungleich 0 (für Summen/Gruppierungen gleichwertig, aber viel kleiner)
+# cache=True: Ergebnis wird in CACHE_DIR abgelegt und bei unveränderten Quelldateien von dort gelesen
+def json2df(stat, lng="de", include=None, exclude=None, sparse=False, cache=True):
+    def build():
+        cube = json2cube(stat, lng)
+        df = cube.sel(include, exclude).to_frame(sparse=sparse, index=_origin(cube, include, exclude))
+        df["Value"] = df["Value"].astype(np.int64)
+        return df
+
+    return _cached("df", stat, build, cache, lng=lng, include=include, exclude=exclude, sparse=sparse)
+
+
+# Erstellt aus den Destasis-JSON-Daten einen beschrifteten Würfel (siehe cube.Cube)
+def json2cube(stat, lng="de", include=None, exclude=None):
+    data, values, structure = _load(stat)
+
+    # Achsen (Codes, Labels, Spaltennamen) je Dimension
+    codes, labels, titles = {}, {}, {}
+    for cat in data["id"]:
+        codes[cat] = _codes(data, cat)
+        labels[cat] = np.array([_label(structure, cat, code)[lng] for code in codes[cat]], dtype=object)
+        titles[cat] = _title(structure, cat)[lng]
+
+    # Filter auf die Achsen anwenden, bevor Zeilen entstehen
+    cube = Cube(values.reshape(data["size"]), data["id"], codes, labels, titles)
+    return cube.sel(include, exclude)
+
+
+# Dekodiert nur die Codes (kategorische Spalten mit Ganzzahl-Codes) und liefert die Labels
+# aller Sprachen getrennt dazu, z.B.:
+#   df, labels = json2codes("12521-0003_Alter")
+#   labels.apply(df, "en")
+def json2codes(stat, include=None, exclude=None, sparse=False, cache=True):
+    def build():
+        data, values, structure = _load(stat)
+        codes = {cat: _codes(data, cat) for cat in data["id"]}
+        cube = Cube(values.reshape(data["size"]), data["id"], codes)
+        df = cube.sel(include, exclude).to_frame(labels=False, sparse=sparse, index=_origin(cube, include, exclude))
+        df["Value"] = df["Value"].astype(np.int64)
+        return df
+
+    df = _cached("codes", stat, build, cache, include=include, exclude=exclude, sparse=sparse)
+
+    # Labels kommen nur aus der (geteilten) Struktur, die Daten-JSON wird dafür nicht gebraucht
+    structure = _structure(_base_path() / f"{stat}_structure.json")
+    dims = [cat for cat in df.columns if cat != "Value"]
+    labels = Labels(
+        {cat: _transpose({code: _label(structure, cat, code) for code in df[cat].cat.categories}) for cat in dims},
+        {cat: _title(structure, cat) for cat in dims},
+    )
+    return df, labels
+
+
+# Labels aller Sprachen je Dimension für Frames aus json2codes
+# values: {Dimension: {Sprache: {Code: Label}}}, titles: {Dimension: {Sprache: Spaltenname}}
+class Labels:
+    def __init__(self, values, titles):
+        self.values = values
+        self.titles = titles
+
+    @property
+    def languages(self):
+        return sorted({lng for per_lng in self.values.values() for lng in per_lng})
+
+    # Label-Spalte hinter jede Code-Spalte einfügen (Spaltenfolge wie bei json2df)
+    # Bei kategorischen Spalten werden nur die Kategorien umbenannt, die Zeilen bleiben Ganzzahl-Codes
+    def apply(self, df, lng="de"):
+        columns = []
+        for col in df.columns:
+            columns.append(df[col])
+            if col in self.values:
+                columns.append(self.resolve(df[col], lng).rename(self.titles[col][lng]))
+        return pd.concat(columns, axis=1)
 
-    # Daten laden
-    with open(base_path / f"{stat}_data.json", encoding="utf8") as f:
-        in_json = f.read()
-    js = json.loads(in_json)
-    data = js["data"][0]
+    def resolve(self, codes, lng="de"):
+        mapping = self.values[codes.name][lng]
+        if not isinstance(codes.dtype, pd.CategoricalDtype):
+            return codes.map(mapping)
+
+        new = [mapping[code] for code in codes.cat.categories]
+        if len(set(new)) == len(new):
+            return codes.cat.rename_categories(new)
+        # doppelte Labels sind als Kategorien nicht erlaubt
+        return pd.Series(np.take(np.array(new, dtype=object), codes.cat.codes), index=codes.index, name=codes.name)
+
+    def to_dict(self):
+        return {"values": self.values, "titles": self.titles}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["values"], d["titles"])
+
+
+# Zeilennummern der Auswahl im vollen Würfel (None = keine Auswahl)
+def _origin(cube, include, exclude):
+    pos = _positions(cube.dims, [cube.codes[d] for d in cube.dims], include, exclude)
+    if pos is None:
+        return None
+    return np.ravel_multi_index(np.ix_(*pos), cube.shape).ravel()
+
+
+def _base_path():
+    return Path(__file__).parent.parent.parent / "Daten" / "Migration"
+
+
+# Daten (Kopf + Werte) und Struktur einer Tabelle laden
+def _load(stat):
+    base_path = _base_path()
+
+    # Daten laden (Kopf als dict, Werte direkt als Numpy-Array)
+    data, values = read_jsonstat(base_path / f"{stat}_data.json")
 
     # Struktur laden
-    with open(base_path / f"{stat}_structure.json", encoding="utf8") as f:
-        in_json = f.read()
-    structure = json.loads(in_json)
+    structure = _structure(base_path / f"{stat}_structure.json")
 
-    # Daten als Numpy-Array einladen
-    arr = np.array(data["value"]).reshape(data["size"])
+    return data, values, structure
 
-    # Array flatten und Indices anspeichern
-    flat_arr = []
-    for idx, subarray in np.ndenumerate(arr):
-        # Addiere den Index und den Wert als Tuple
-        flat_arr.append((idx, subarray))
 
-    # Liste zur Übersetzung der Indices in Codes erstellen
-    dim = []
-    for cat in data["id"]:
-        ind = data["dimension"][cat]["category"]["index"]
-        ind_rev = {value: key for key, value in ind.items()}
-        dim.append(ind_rev)
-
-    # Incdies in Codes/Werte übersetzen und Tabelle erstellen
-    table = []
-    for x in flat_arr:
-        row = []
-        for i, j in enumerate(x[0]):
-            code = dim[i][j]
-            if data["id"][i] == "statistic":
-                val = structure["statistics"][code]["label"][lng]
-            elif data["id"][i] == "content":
-                code = code.split('$')[0]
-                val = structure["contents"][code]["label"][lng]
+# Struktur-JSON nur einmal je Inhalt parsen (z.B. 12511-0006 und 12511-0006_staat sind identisch)
+def _structure(path):
+    key = _file_hash(path)
+    if key not in _STRUCTURES:
+        with open(path, encoding="utf8") as f:
+            in_json = f.read()
+        _STRUCTURES[key] = json.loads(in_json)
+    return _STRUCTURES[key]
+
+
+# SHA-256 des Dateiinhalts, je (Pfad, Änderungszeit, Größe) nur einmal berechnet
+def _file_hash(path):
+    stat = os.stat(path)
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _HASHES:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _HASHES[key] = h.hexdigest()
+    return _HASHES[key]
+
+
+# Ergebnis von build() über den Inhalt der Quelldateien und die Parameter zwischenspeichern
+def _cached(kind, stat, build, cache, **params):
+    if not cache:
+        return build()
+
+    base_path = _base_path()
+    params = {k: _normalize(v) for k, v in params.items()}
+    key = hashlib.sha256(json.dumps([
+        kind,
+        _CACHE_VERSION,
+        _file_hash(base_path / f"{stat}_data.json"),
+        _file_hash(base_path / f"{stat}_structure.json"),
+        params,
+    ], sort_keys=True).encode()).hexdigest()
+
+    path = CACHE_DIR / f"{key}.feather"
+    if path.exists():
+        df = pd.read_feather(path)
+        if _INDEX in df.columns:
+            df = df.set_index(_INDEX)
+            df.index.name = None
+        return df
+
+    df = build()
+    CACHE_DIR.mkdir(exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    # Feather speichert nur den Standard-Index, andere Indizes als Spalte ablegen
+    if df.index.equals(pd.RangeIndex(len(df))):
+        df.to_feather(tmp)
+    else:
+        df.reset_index(names=_INDEX).to_feather(tmp)
+    os.replace(tmp, path)
+    return df
+
+
+# Filter in eine eindeutige, JSON-fähige Form bringen
+def _normalize(value):
+    if isinstance(value, dict):
+        return {k: sorted(_as_list(v)) for k, v in value.items()}
+    return value
+
+
+# Codes einer Dimension in Achsen-Reihenfolge (bei "content" ohne "$Funktion")
+def _codes(data, cat):
+    ind = data["dimension"][cat]["category"]["index"]
+    codes = np.empty(len(ind), dtype=object)
+    for code, pos in ind.items():
+        codes[pos] = code.split('$')[0] if cat == "content" else code
+    return codes
+
+
+# Labels eines Codes in allen Sprachen: {Sprache: Label}
+def _label(structure, cat, code):
+    if cat == "statistic":
+        label = structure["statistics"][code]["label"]
+    elif cat == "content":
+        label = structure["contents"][code]["label"]
+    else:
+        label = structure["variableValues"][code]["label"]
+    return {lng: val for lng, val in label.items() if isinstance(val, str)}
+
+
+# Spaltenname der Label-Spalte in allen Sprachen
+def _title(structure, cat):
+    if cat in ["statistic", "content"]:
+        return defaultdict(lambda: cat + "_desc")
+    label = structure["variables"][cat]["label"]
+    return {lng: val for lng, val in label.items() if isinstance(val, str)}
+
+
+# {Code: {Sprache: Label}} -> {Sprache: {Code: Label}}
+def _transpose(labels):
+    out = {}
+    for code, per_lng in labels.items():
+        for lng, val in per_lng.items():
+            out.setdefault(lng, {})[code] = val
+    return out
+
+
+# Liest eine GENESIS-JSON-stat-Datei stückweise ein, ohne den ganzen Objektbaum aufzubauen:
+# Kopf (code/id/size/dimension/...) als dict, "value" direkt in ein vorab angelegtes float64-Array,
+# "status" wird überlesen. Es wird wie bei json2df nur der erste Datensatz in "data" gelesen.
+# values=False: nur den Kopf lesen (Werte werden übersprungen, Rückgabe (Kopf, None))
+def read_jsonstat(path, chunk_size=1 << 20, values=True):
+    with open(path, encoding="utf8") as f:
+        stream = _JsonStream(f, chunk_size)
+        stream.expect("{")
+        while stream.key() != "data":
+            stream.value()
+            stream.expect(",")
+        stream.expect("[")
+        stream.expect("{")
+
+        header, arr = {}, None
+        while True:
+            key = stream.key()
+            if key == "value" and values:
+                arr = stream.numbers(header.get("size"))
+            elif key in ("value", "status"):
+                stream.skip_array()
+            else:
+                header[key] = stream.value()
+            if stream.expect(",}") == "}":
+                break
+
+    if not values:
+        return header, None
+    if arr is None:
+        raise ValueError(f"{path}: kein 'value'-Array gefunden")
+    if "size" in header and arr.size != np.prod(header["size"], dtype=np.int64):
+        raise ValueError(f"{path}: {arr.size} Werte passen nicht zu size={header['size']}")
+    return header, arr
+
+
+_WS = re.compile(r"\s*")
+_ARRAY_CONTENT = re.compile(r'(?:[^"\[\]]+|"(?:[^"\\]|\\.)*")*')
+_DECODER = json.JSONDecoder()
+
+
+# Minimaler Lese-Puffer über eine Textdatei für read_jsonstat
+class _JsonStream:
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unerwartetes Dateiende")
+
+    def expect(self, chars):
+        c = self._peek()
+        if c not in chars:
+            raise ValueError(f"Erwartet {chars!r}, gefunden {c!r}")
+        self.pos += 1
+        return c
+
+    def key(self):
+        key = self.value()
+        self.expect(":")
+        return key
+
+    # Kleinere JSON-Werte (Kopfdaten) normal dekodieren, bei Bedarf nachladen
+    def value(self):
+        self._peek()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+                # Zahl am Pufferende könnte abgeschnitten sein
+                if end < len(self.buf) or not self._fill():
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    # Zahlen-Array blockweise in ein Numpy-Array schreiben
+    def numbers(self, size=None):
+        self.expect("[")
+        out = np.empty(int(np.prod(size, dtype=np.int64)), dtype=np.float64) if size else None
+        parts, n = [], 0
+        while True:
+            end = self.buf.find("]", self.pos)
+            cut = end if end != -1 else self.buf.rfind(",", self.pos)
+            if cut == -1:
+                if not self._fill():
+                    raise ValueError("Unerwartetes Dateiende im 'value'-Array")
+                continue
+
+            segment = self.buf[self.pos:cut]
+            self.pos = cut + 1
+            if segment.strip():
+                vals = np.fromstring(segment.replace("null", "nan"), sep=",")
+                if out is None:
+                    parts.append(vals)
+                elif n + len(vals) > len(out):
+                    raise ValueError(f"Mehr Werte als size={size}")
+                else:
+                    out[n:n + len(vals)] = vals
+                n += len(vals)
+            if end != -1:
+                break
+
+        return np.concatenate(parts) if out is None else out[:n]
+
+    # Array überspringen, ohne es zu dekodieren (Strings dürfen Klammern enthalten)
+    def skip_array(self):
+        self.expect("[")
+
+        # Schneller Weg für flache Arrays ohne Escapes (z.B. "status"): bis zur "]" außerhalb eines Strings
+        while True:
+            end = self.buf.find("]", self.pos)
+            segment = self.buf[self.pos:end if end != -1 else len(self.buf)]
+            if "[" in segment or "\\" in segment:
+                break
+            if segment.count('"') % 2 == 0:
+                if end != -1:
+                    self.pos = end + 1
+                    return
+                self.pos = len(self.buf)
+            elif end == -1:
+                # angefangenen String behalten
+                self.pos = self.buf.rindex('"', self.pos)
             else:
-                val = structure["variableValues"][code]["label"][lng]
-            
-            row.append(code)
-            row.append(val)
-
-            
-        row.append(int(x[1]))
-        table.append(row)
-
-    # Spaltennamen erstellen
-    cols = [item for sublist in [[col, structure["variables"][col]["label"][lng] if not col in ["statistic", "content"] else col + "_desc"] for col in data["id"]] for item in sublist] + ["Value"]
-    
-    # Tabelle als DataFrame zurückgeben
-    return pd.DataFrame(table, columns=cols)
\ No newline at end of file
+                break
+            if not self._fill():
+                raise ValueError("Unerwartetes Dateiende")
+
+        depth = 1
+        while depth:
+            self.pos = _ARRAY_CONTENT.match(self.buf, self.pos).end()
+            if self.pos == len(self.buf) or self.buf[self.pos] == '"':
+                # Pufferende bzw. String am Pufferende abgeschnitten
+                if not self._fill():
+                    raise ValueError("Unerwartetes Dateiende")
+                continue
+            depth += 1 if self.buf[self.pos] == "[" else -1
+            self.pos += 1
@@ -0,0 +1,198 @@
+# Download-Client für die GENESIS-Webservice-Schnittstelle (tablefile) von Destatis
+# (ersetzt die Einzelabfragen aus Daten/Archiv/API_DESTATIS.ipynb)
+#
+#   client = GenesisClient(username, password)
+#   client.fetch_all(["12711-0005", "12521-0002"], out_dir="Daten/Migration/downloads")
+#
+# Kommandozeile (Zugangsdaten über GENESIS_USERNAME / GENESIS_PASSWORD):
+#   python Daten/Migration/genesis.py 12711-0005 12521-0002 --jobs 4
+#
+# Ohne echten Webservice testen: python Daten/Migration/genesis_testserver.py
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://www-genesis.destatis.de/genesisWS/rest/2020"
+CACHE_DIR = Path(__file__).parent / ".cache" / "genesis"
+# Bei diesen Statuscodes wird die Anfrage wiederholt
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# Ergebnis eines Downloads: changed=False, wenn die Tabelle seit dem letzten Abruf unverändert ist
+class FetchResult:
+    def __init__(self, table, path, changed, sha256):
+        self.table = table
+        self.path = path
+        self.changed = changed
+        self.sha256 = sha256
+
+    def __repr__(self):
+        return f"FetchResult({self.table!r}, changed={self.changed}, path='{self.path}')"
+
+
+class GenesisClient:
+    # base_url kann auf einen lokalen Ersatz-Server zeigen (z.B. http://127.0.0.1:8000)
+    def __init__(self, username=None, password=None, base_url=BASE_URL, cache_dir=CACHE_DIR,
+                 pool_size=8, retries=4, backoff=0.5, timeout=120):
+        self.username = username if username is not None else os.environ.get("GENESIS_USERNAME", "")
+        self.password = password if password is not None else os.environ.get("GENESIS_PASSWORD", "")
+        self.base_url = base_url.rstrip("/")
+        self.cache_dir = Path(cache_dir)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        # Gemeinsamer Verbindungs-Pool für alle Threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Mehrere Tabellen parallel laden (höchstens max_workers gleichzeitig)
+    # Rückgabe: {Tabelle: FetchResult oder Exception}
+    def fetch_all(self, tables, out_dir, max_workers=4, **params):
+        out_dir = Path(out_dir)
+        ext = params.get("format", "csv")
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self.fetch, table, out_dir / f"{table}.{ext}", **params): table for table in tables}
+            for future in as_completed(futures):
+                table = futures[future]
+                try:
+                    results[table] = future.result()
+                except Exception as e:
+                    results[table] = e
+        return {table: results[table] for table in tables}
+
+    # Eine Tabelle laden und unter target speichern; unveränderte Tabellen werden nicht neu geschrieben
+    # params: weitere Parameter für tablefile (z.B. startyear, endyear, language, format)
+    def fetch(self, table, target, **params):
+        target = Path(target)
+        query = {
+            "name": table,
+            "area": "all",
+            "compress": "false",
+            "transpose": "false",
+            "language": "de",
+            **params,
+        }
+        # Metadaten je Tabelle, Parametern und Ziel: dieselbe Tabelle z.B. mit anderem startyear hat eigenen ETag
+        key = json.dumps([str(target.resolve()), query], sort_keys=True)
+        meta_path = self.cache_dir / f"{table}-{hashlib.sha256(key.encode('utf8')).hexdigest()[:16]}.json"
+        meta = _read_json(meta_path) if target.exists() else {}
+        # Zugangsdaten als Header, nicht in der URL (die landet z.B. in Fehlermeldungen)
+        headers = {"username": self.username, "password": self.password}
+        # Bedingte Anfrage: Server kann mit 304 antworten, wenn sich nichts geändert hat
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self._get("/data/tablefile", query, headers)
+        if response.status_code == 304:
+            return FetchResult(table, target, False, meta["sha256"])
+        response.raise_for_status()
+
+        content = response.content
+        if "zip" in response.headers.get("Content-Type", "") or query["compress"] == "true":
+            with zipfile.ZipFile(io.BytesIO(content)) as z:
+                content = z.read(z.namelist()[0])
+
+        # Gleicher Inhalt wie beim letzten Abruf -> Datei nicht anfassen
+        sha256 = hashlib.sha256(content).hexdigest()
+        changed = sha256 != meta.get("sha256")
+        if changed:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(content)
+            os.replace(tmp, target)
+
+        _write_json(meta_path, {
+            "sha256": sha256,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        return FetchResult(table, target, changed, sha256)
+
+    # GET mit Wiederholung und exponentiellem Backoff (Retry-After wird beachtet)
+    def _get(self, path, params, headers):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(self.base_url + path, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+            else:
+                if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                    return response
+                delay = _retry_after(response) or self.backoff * 2 ** attempt
+            time.sleep(delay)
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_json(path):
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf8") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lädt GENESIS-Tabellen (nur geänderte werden neu geschrieben)")
+    parser.add_argument("tables", nargs="+", help="Tabellencodes, z.B. 12711-0005")
+    parser.add_argument("--out", default=str(Path(__file__).parent / "downloads"), help="Zielordner")
+    parser.add_argument("--jobs", type=int, default=4, help="gleichzeitige Downloads")
+    parser.add_argument("--url", default=os.environ.get("GENESIS_URL", BASE_URL), help="Basis-URL des Webservice")
+    parser.add_argument("--startyear")
+    parser.add_argument("--endyear")
+    args = parser.parse_args()
+
+    params = {k: v for k, v in {"startyear": args.startyear, "endyear": args.endyear}.items() if v}
+    with GenesisClient(base_url=args.url, pool_size=args.jobs) as client:
+        results = client.fetch_all(args.tables, args.out, max_workers=args.jobs, **params)
+
+    for table, result in results.items():
+        if isinstance(result, Exception):
+            print(f"{table:16} FEHLER: {result!r}")
+        else:
+            print(f"{table:16} {'neu/geändert' if result.changed else 'unverändert'} -> {result.path}")
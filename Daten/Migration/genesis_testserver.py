@@ -0,0 +1,146 @@
+# Lokaler Ersatz für den GENESIS-Webservice (tablefile) und Selbsttest für genesis.py
+#
+#   python Daten/Migration/genesis_testserver.py                # Selbsttest: Retry, 304, zip, 404
+#   python Daten/Migration/genesis_testserver.py --serve 8000   # nur Server starten, dann z.B.
+#   python Daten/Migration/genesis.py 12711-0005 --url http://127.0.0.1:8000
+#
+# Verhalten je Tabellencode (Parameter name):
+#   RETRY-*: die ersten beiden Anfragen mit 503 (Retry-After: 0), danach 200
+#   ZIP-*:   Inhalt als zip (Content-Type application/zip)
+#   FEHLT-*: 404
+#   sonst:   200 mit ETag, bei passendem If-None-Match 304
+# Der Inhalt hängt von Tabelle und startyear ab, der ETag nur von der Tabelle (Stand der Tabelle)
+# Zugangsdaten werden nur als Header angenommen (username/password in der URL -> 400)
+import argparse
+import hashlib
+import io
+import sys
+import tempfile
+import threading
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from genesis import GenesisClient
+
+
+class GenesisHandler(BaseHTTPRequestHandler):
+    # Anfragen je Tabellencode (für die Retry-Prüfung)
+    hits = Counter()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        table = query.get("name", "")
+        self.hits[table] += 1
+
+        if url.path != "/data/tablefile":
+            return self._send(404, b"unbekannter Pfad")
+        if "username" in query or "password" in query:
+            return self._send(400, b"Zugangsdaten in der URL")
+        if not self.headers.get("username"):
+            return self._send(401, b"Zugangsdaten fehlen")
+
+        if table.startswith("FEHLT-"):
+            return self._send(404, b"Tabelle nicht gefunden")
+        if table.startswith("RETRY-") and self.hits[table] <= 2:
+            return self._send(503, b"ausgelastet", {"Retry-After": "0"})
+
+        content = _content(table, query.get("startyear"))
+        if table.startswith("ZIP-"):
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w") as z:
+                z.writestr(f"{table}.csv", content)
+            return self._send(200, buffer.getvalue(), {"Content-Type": "application/zip"})
+
+        etag = '"' + hashlib.sha256(_content(table)).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", {"ETag": etag})
+        self._send(200, content, {"Content-Type": "text/csv", "ETag": etag})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _content(table, startyear=None):
+    text = f"Tabelle;{table}\nWert;1\n"
+    if startyear:
+        text += f"Ab;{startyear}\n"
+    return text.encode("utf8")
+
+
+def serve(port=0):
+    server = ThreadingHTTPServer(("127.0.0.1", port), GenesisHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def selftest():
+    server = serve()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    failed = 0
+
+    def check(name, ok):
+        nonlocal failed
+        print(f"{name:40} {'ok' if ok else 'FEHLER'}")
+        failed += not ok
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            GenesisClient("nutzer", "geheim", base_url=url, cache_dir=Path(tmp) / "cache", backoff=0) as client:
+        out = Path(tmp) / "out"
+
+        first = client.fetch("12711-0005", out / "12711-0005.csv")
+        second = client.fetch("12711-0005", out / "12711-0005.csv")
+        check("Erster Abruf schreibt Datei", first.changed and first.path.read_bytes() == _content("12711-0005"))
+        check("Zweiter Abruf: 304, unverändert", not second.changed and second.sha256 == first.sha256)
+
+        # Gleiche Tabelle mit anderem startyear in eine andere Datei: kein 304 mit dem ETag des ersten Abrufs
+        other = client.fetch("12711-0005", out / "12711-0005_ab2020.csv", startyear="2020")
+        check("Andere Parameter: eigener Abruf", other.changed
+              and other.path.read_bytes() == _content("12711-0005", "2020"))
+        again = client.fetch("12711-0005", out / "12711-0005.csv")
+        check("Erster Abruf: 304 mit eigener Prüfsumme", not again.changed and again.sha256 == first.sha256)
+
+        result = client.fetch("RETRY-1", out / "RETRY-1.csv")
+        check("503 wird wiederholt", result.changed and GenesisHandler.hits["RETRY-1"] == 3)
+
+        result = client.fetch("ZIP-1", out / "ZIP-1.csv")
+        check("zip wird entpackt", result.path.read_bytes() == _content("ZIP-1"))
+
+        results = client.fetch_all(["FEHLT-1", "12521-0002"], out)
+        error = results["FEHLT-1"]
+        check("404 als Fehler, andere laufen weiter",
+              isinstance(error, requests.HTTPError) and error.response.status_code == 404
+              and not isinstance(results["12521-0002"], Exception))
+        check("Passwort nicht in der Fehlermeldung", "geheim" not in repr(error))
+
+    server.shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler GENESIS-Ersatz-Server und Selbsttest für genesis.py")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="nur den Server auf PORT starten")
+    args = parser.parse_args()
+
+    if args.serve is None:
+        sys.exit(selftest())
+    server = serve(args.serve)
+    print(f"GENESIS-Ersatz läuft auf http://127.0.0.1:{server.server_address[1]} (Strg+C beendet)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,4 +1,5 @@
 import streamlit as st
+from modules.plots import payload_summary, reset_payload
 
 # Seiten-Layout
 st.set_page_config(page_title="Migration & Integration in Deutschland", layout="wide")
@@ -46,4 +47,9 @@ hauptkategorien = {
 }
 
 pg = st.navigation(hauptkategorien)
-pg.run()
\ No newline at end of file
+
+# Diagramm-Bytes je Durchlauf messen (Aufruf mit ?payload in der URL)
+reset_payload()
+pg.run()
+if "payload" in st.query_params:
+    st.sidebar.caption(payload_summary())
\ No newline at end of file
@@ -0,0 +1,398 @@
+import functools
+import json
+import operator
+import numpy as np
+import streamlit as st
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+from pathlib import Path
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+DATA_DIR = "Streamlit/data/migration"
+# Standard für die Anzahl einzeln gezeigter Gruppen (übrige als "Andere")
+TOP_N = 10
+
+# Aufbau der Dateien in Streamlit/data/migration (erzeugt von Daten/Migration/build.py)
+# categories: Gruppen-Spalten als Categorical (wenige Werte, viele Zeilen)
+# dtypes: feste Typen, damit nichts geraten werden muss
+# date: Stichtag-Spalte (JJJJ-MM-TT) -> datetime + Ganzzahl-Spalte "Jahr"
+DATASETS = {
+    "historisch_gesamt.csv": {"categories": ["Nationalität"], "date": "STAG"},
+    "historisch_ländergruppen.csv": {"categories": ["Ländergruppierungen"], "date": "STAG"},
+    "historisch_staaten.csv": {"categories": ["Staatsangehörigkeit"], "date": "STAG"},
+    "historisch_titel.csv": {"categories": ["Ausgewählte Aufenthaltstitel"], "date": "STAG"},
+    "alterspyramide.csv": {"categories": ["Ländergruppierungen", "GES"], "dtypes": {"ALT": "int64"}},
+    "alterspyramide_de.csv": {"categories": ["GES"], "dtypes": {"ALT": "int64"}},
+    "alter_stichtage.csv": {"categories": ["Ländergruppierungen", "GES"], "dtypes": {"ALT": "int64"}, "date": "STAG"},
+    "einbürg_ländergruppen.csv": {"categories": ["Ländergruppierungen"], "dtypes": {"Jahr": "int64"}},
+    "einbürg_recht.csv": {"categories": ["Rechtsgrundlagen"], "dtypes": {"Jahr": "int64"}},
+    "einbürg_gesamt.csv": {"categories": ["Staatsangehörigkeit"], "dtypes": {"Jahr": "int64"}},
+    "einbürg_staaten.csv": {"categories": ["Staatsangehörigkeit"], "dtypes": {"Jahr": "int64"}},
+    "wander_staaten.csv": {"categories": ["Herkunfts-/Zielländer"], "dtypes": {"Jahr": "int64"}},
+    "wander_gesamt.csv": {"categories": ["Art"], "dtypes": {"Jahr": "int64"}},
+    "wander_gesamt_de.csv": {"categories": ["Art"], "dtypes": {"Jahr": "int64"}},
+    "scatter_plot_anteil_dichte.csv": {
+        "categories": ["Staatsangehörigkeit"],
+        "dtypes": {"Dichte": "float64", "Anteil": "float64"},
+        "value": None,
+    },
+    "scatter_plot_anteil_dichte_corr.csv": {
+        "categories": ["Staatsangehörigkeit"],
+        "dtypes": {"Correlation": "float64"},
+        "value": None,
+    },
+}
+
+
+# Datei laut DATASETS laden; jeder Aufruf bekommt einen eigenen DataFrame, Änderungen am Ergebnis sind also unkritisch
+# columns: nur diese Spalten (z.B. ["Jahr", "Staatsangehörigkeit", "Value"])
+# Gibt es die von build.py erzeugte .feather-Datei, kommt sie aus _feather_table und nur die angefragten
+# Spalten werden nach pandas umgewandelt; sonst die CSV (schneller C-Parser, kein Raten des Trennzeichens)
+def load_dataset(file, columns=None):
+    columns = list(columns) if columns else None
+
+    path = _path(file)
+    if path.suffix == ".feather":
+        table = _feather_table(str(path))
+        return (table.select(columns) if columns else table).to_pandas()
+    return _load_csv(file, columns)
+
+
+# Arrow-Tabelle einmal je Server-Prozess, von allen Sitzungen geteilt (unveränderlich, daher ohne Kopie)
+# Unkomprimierte Dateien bleiben memory-mapped: Spalten werden erst beim Zugriff von der Platte gelesen und
+# belegen keinen eigenen Speicher. Komprimierte (z.B. alter_stichtage, zstd) werden einmal entpackt.
+@st.cache_resource(show_spinner=False)
+def _feather_table(path):
+    return feather.read_table(path, memory_map=True)
+
+
+# CSV-Dateien ohne .feather: geparst über alle Sitzungen gecacht, st.cache_data liefert je Aufruf eine Kopie
+@st.cache_data
+def _load_csv(file, columns=None):
+    df = _read_csv(file)
+    return df[columns] if columns else df
+
+
+# Stand der gelesenen Datei (Änderungszeit, Größe); ändert sich, sobald build.py sie neu schreibt
+# (z.B. als Teil von Cache-Schlüsseln für daraus erzeugte Diagramme)
+def dataset_version(file):
+    stat = _path(file).stat()
+    return f"{file}@{stat.st_mtime_ns}:{stat.st_size}"
+
+
+# .feather von build.py, falls vorhanden, sonst die CSV
+def _path(file):
+    if file not in DATASETS:
+        raise KeyError(f"Unbekannter Datensatz: {file} (in modules/daten.py DATASETS eintragen)")
+    path = Path(DATA_DIR) / Path(file).with_suffix(".feather").name
+    if path.exists():
+        return path
+    return Path(DATA_DIR) / file
+
+
+def _read_csv(file):
+    spec = DATASETS[file]
+
+    dtypes = {col: "category" for col in spec.get("categories", [])}
+    dtypes.update(spec.get("dtypes", {}))
+    if spec.get("value", "int64"):
+        dtypes["Value"] = spec.get("value", "int64")
+
+    df = pd.read_csv(f"{DATA_DIR}/{file}", sep=spec.get("sep", ","), engine="c", index_col=0, dtype=dtypes)
+
+    if "date" in spec:
+        df[spec["date"]] = pd.to_datetime(df[spec["date"]], format="%Y-%m-%d")
+        df["Jahr"] = df[spec["date"]].dt.year.astype("int64")
+    return df
+
+
+# Kumulierte Summen von value je (Gruppe, Jahr) über alle bisherigen Jahre, einmal je Datei und Spalte
+# (für laufende Summen und kumulierte Kreisdiagramme: jeder Wert ist danach ein Index-Zugriff)
+@st.cache_resource(show_spinner=False)
+def prefix_sums(file, col, value="Value"):
+    return PrefixSums(load_dataset(file, ["Jahr", col, value]), col, value)
+
+
+# counts[g, j]: Wert der Gruppe groups[g] im Jahr years[j], present[g, j]: es gibt dazu eine Zeile
+# cum[g, j]: Summe der Gruppe groups[g] für alle Jahre <= years[j]
+# total[j]: dasselbe über alle Gruppen, first[g]: Position des ersten Jahres mit Daten der Gruppe
+class PrefixSums:
+    def __init__(self, df, col, value="Value"):
+        self.col = col
+        codes, groups = pd.factorize(df[col])
+        self.groups = pd.Index(groups)
+        self.years, pos = np.unique(df["Jahr"].to_numpy(), return_inverse=True)
+
+        self.counts = np.zeros((len(self.groups), len(self.years)), dtype=np.int64)
+        np.add.at(self.counts, (codes, pos), df[value].to_numpy())
+        self.present = np.zeros(self.counts.shape, dtype=bool)
+        self.present[codes, pos] = True
+        self.cum = self.counts.cumsum(axis=1)
+        self.total = self.cum.sum(axis=0)
+        self.first = np.full(len(self.groups), len(self.years))
+        np.minimum.at(self.first, codes, pos)
+
+    # Position des letzten Jahres <= year (-1: vor dem ersten Jahr)
+    def year_pos(self, years):
+        return np.searchsorted(self.years, years, side="right") - 1
+
+    # Summe je Gruppe bis einschließlich year (nur Gruppen, die bis dahin vorkommen): eine Spalte aus cum
+    # Die n größten einzeln, alle übrigen als "Andere" (Auswahl wie bei rollup ohne von)
+    def at(self, year, n=TOP_N):
+        j = int(self.year_pos(year))
+        groups = np.flatnonzero(self.first <= j)
+        values = self.cum[groups, j] if j >= 0 else np.zeros(len(groups), dtype=np.int64)
+
+        rest = None
+        if len(groups) > n:
+            top = np.sort(np.argsort(-values, kind="stable")[:n])
+            rest = values.sum() - values[top].sum()
+            groups, values = groups[top], values[top]
+
+        df = pd.DataFrame({self.col: self.groups[groups], "Value": values})
+        if rest is not None:
+            df = pd.concat([df, pd.DataFrame({self.col: ["Andere"], "Value": [rest]})], ignore_index=True)
+        return df
+
+    # Laufende Summe je Zeile (Gruppe, Jahr); unbekannte Gruppen (z.B. "Andere" aus rollup)
+    # bekommen die Summe aller Gruppen, die nicht in groups vorkommen
+    def lookup(self, groups, years):
+        idx = self.groups.get_indexer(groups)
+        pos = self.year_pos(np.asarray(years))
+        values = self.cum[np.maximum(idx, 0), pos]
+        unknown = idx < 0
+        if unknown.any():
+            rest = self.total - self.cum[np.unique(idx[~unknown])].sum(axis=0)
+            values = np.where(unknown, rest[pos], values)
+        return values
+
+    # Die n größten Gruppen im Zeitraum von..bis (Summe), alle übrigen je Jahr als "Andere"
+    # Zeilen (Jahr, Spalte, Value) wie im Datensatz, Gruppen in der Reihenfolge des Datensatzes
+    def rollup(self, von=None, bis=None, n=TOP_N):
+        lo = 0 if von is None else int(np.searchsorted(self.years, von, side="left"))
+        hi = len(self.years) if bis is None else int(np.searchsorted(self.years, bis, side="right"))
+        present = self.present[:, lo:hi]
+        groups = np.flatnonzero(present.any(axis=1))
+
+        rest = groups[:0]
+        if len(groups) > n:
+            totals = self.cum[groups, hi - 1] - (self.cum[groups, lo - 1] if lo > 0 else 0)
+            top = np.sort(groups[np.argsort(-totals, kind="stable")[:n]])
+            rest = np.setdiff1d(groups, top)
+            groups = top
+
+        g, j = np.nonzero(present[groups])
+        df = pd.DataFrame({
+            "Jahr": self.years[lo + j],
+            self.col: self.groups[groups[g]],
+            "Value": self.counts[groups[g], lo + j],
+        })
+        if len(rest):
+            j = np.flatnonzero(present[rest].any(axis=0))
+            andere = pd.DataFrame({"Jahr": self.years[lo + j], self.col: "Andere", "Value": self.counts[rest][:, lo + j].sum(axis=0)})
+            df = pd.concat([df, andere], ignore_index=True)
+        return df
+
+
+# Top-n + "Andere" je (Datei, Spalte, Zeitraum, n), über alle Sitzungen gecacht; von/bis None = offen
+# Nur im Speicher des Server-Prozesses, nicht als Datei neben dem Datensatz: n und Zeitraum sind frei wählbar,
+# und aus den Präfixsummen ist jede Kombination ohne Sortieren des ganzen Datensatzes berechnet
+@st.cache_data(show_spinner=False)
+def rollup(file, col, von=None, bis=None, n=TOP_N):
+    return prefix_sums(file, col).rollup(von, bis, n)
+
+
+# Geschlecht in der Reihenfolge von AgePyramid.counts[:, :, i]
+SEXES = ["GESM", "GESW"]
+
+# Gewichtete Altersquantile für age_stats (Spaltenname: Anteil)
+QUANTILES = {"P10": 0.1, "P25": 0.25, "Median": 0.5, "P75": 0.75, "P90": 0.9}
+
+
+# Alterspyramide als Würfel counts[Gruppe, Stichtag, Geschlecht, Alter], einmal je Datei über alle Sitzungen
+# Grundlage ist der Cube, den Daten/Migration/build.py neben der Datei speichert (Rezept-Option cube)
+# group_col: Gruppen-Dimension (z.B. "Ländergruppierungen"), ohne sie gibt es genau eine Gruppe (None)
+# date_col: Stichtag-Dimension (z.B. "STAG"), ohne sie gibt es genau einen Stichtag (None)
+@st.cache_resource(show_spinner=False)
+def age_pyramid(file, group_col=None, date_col=None):
+    return AgePyramid(*_open_cube(file), group_col, date_col)
+
+
+# Altersquantile, Durchschnittsalter und Männer je Frau für jede Gruppe und jeden Stichtag (siehe AgePyramid.stats)
+@st.cache_data(show_spinner=False)
+def age_stats(file, group_col=None, date_col=None):
+    return age_pyramid(file, group_col, date_col).stats()
+
+
+# Gespeicherter Cube (<datei ohne .csv>.npy + .json) als (Werte memory-mapped, Codes je Dimension)
+# Format wie Cube.save/Cube.open in Daten/Migration/cube.py; hier ohne die Klasse, die App importiert nur Streamlit/
+def _open_cube(file):
+    path = Path(DATA_DIR) / Path(file).stem
+    with open(path.with_suffix(".json"), encoding="utf8") as f:
+        manifest = json.load(f)
+    values = np.load(path.with_suffix(".npy"), mmap_mode="r")
+    return values, {dim: manifest["codes"][dim] for dim in manifest["dims"]}
+
+
+# Cube-Werte in die Achsen (Gruppe, Stichtag, Geschlecht, Alter) gebracht, fehlende Achsen mit Länge 1;
+# solange nichts umsortiert werden muss, bleibt counts eine View auf die memory-mapped Datei
+# Alter ist direkt der Index der letzten Achse (0 bis höchstes Alter, fehlende Alter zählen 0)
+class AgePyramid:
+    def __init__(self, values, codes, group_col=None, date_col=None):
+        dims = list(codes)
+        counts = np.transpose(values, [dims.index(d) for d in (group_col, date_col, "GES", "ALT") if d])
+        if not group_col:
+            counts = counts[None]
+        if not date_col:
+            counts = counts[:, None]
+        self.group_col = group_col
+        self.groups = pd.Index(codes[group_col] if group_col else [None])
+
+        if date_col:
+            dates = pd.to_datetime(pd.Index(codes[date_col]), format="%Y-%m-%d")
+            order = np.argsort(dates, kind="stable")
+            if (order != np.arange(len(order))).any():
+                counts, dates = counts[:, order], dates[order]
+            self.dates = dates
+        else:
+            self.dates = pd.Index([None])
+
+        if codes["GES"] != SEXES:
+            counts = counts[:, :, [codes["GES"].index(sex) for sex in SEXES]]
+
+        ages = np.asarray(codes["ALT"])
+        if (ages != np.arange(len(ages))).any():
+            full = np.zeros(counts.shape[:-1] + (ages.max() + 1,), dtype=counts.dtype)
+            full[..., ages] = counts
+            counts = full
+        self.counts = counts
+
+    # (Geschlecht, Alter)-Ausschnitt einer Gruppe, bis: höchstes Alter (inklusive), stichtag: None = der letzte
+    def get(self, group=None, bis=None, stichtag=None):
+        g = 0 if group is None else self.groups.get_loc(group)
+        d = -1 if stichtag is None else self.dates.get_loc(stichtag)
+        return self.counts[g, d, :, :None if bis is None else bis + 1]
+
+    # Eine Zeile je (Gruppe, Stichtag) mit Personen: Quantile (erstes Alter, bei dem die kumulierte Anzahl den
+    # Anteil erreicht, wie searchsorted je Zeile), Durchschnittsalter und Männer je Frau; alles in einem Durchgang
+    # über den ganzen Würfel. Das höchste Alter steht für "und älter", der Durchschnitt ist dort also eine Untergrenze
+    def stats(self, quantiles=QUANTILES):
+        per_age = self.counts.sum(axis=2)
+        kumuliert = per_age.cumsum(axis=-1)
+        total = kumuliert[..., -1]
+        anteile = np.array(list(quantiles.values()))
+
+        # (Gruppe, Stichtag, Quantil): Anzahl Alter, deren kumulierte Anzahl noch unter dem Anteil liegt
+        werte = (kumuliert[:, :, None, :] < anteile[:, None] * total[:, :, None, None]).sum(axis=-1)
+        men, women = self.counts.sum(axis=-1).transpose(2, 0, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = (per_age * np.arange(per_age.shape[-1])).sum(axis=-1) / total
+            ratio = men / women
+
+        g, d = np.nonzero(total)
+        df = pd.DataFrame({self.group_col or "Gruppe": self.groups[g], "Stichtag": self.dates[d]})
+        for i, name in enumerate(quantiles):
+            df[name] = werte[g, d, i]
+        df["Durchschnittsalter"] = mean[g, d]
+        df["Männer je Frau"] = ratio[g, d]
+        df["Personen"] = total[g, d]
+        return df
+
+
+# Abfrage mit Filter- und Spalten-Pushdown: nur die Ergebniszeilen landen in pandas
+# include/exclude: {Spalte: Wert oder Liste} (wie bei json2df), between: {Spalte: (von, bis)}, Grenzen inklusive, None = offen
+# group_by: Summe von value je Gruppe; pivot: (Index-Spalte(n), Spalten-Spalte) -> breite Tabelle wie
+# pivot_table(aggfunc="sum", fill_value=0)
+# Mit installiertem DuckDB (optional, pip install duckdb) läuft die Abfrage dort, sonst über pyarrow.dataset
+@st.cache_data
+def query(file, columns=None, include=None, exclude=None, between=None, group_by=None, pivot=None, value="Value"):
+    if pivot:
+        index, pivot_col = pivot
+        group_by = _as_list(index) + [pivot_col]
+    if group_by:
+        columns = _as_list(group_by) + [value]
+    columns = list(columns) if columns else None
+
+    dataset = _dataset(file)
+    if duckdb is not None:
+        df = _query_duckdb(dataset, columns, include or {}, exclude or {}, between or {}, group_by, value)
+    else:
+        df = _query_arrow(dataset, columns, include or {}, exclude or {}, between or {}, group_by, value)
+
+    if pivot:
+        return df.pivot(index=index, columns=pivot_col, values=value).fillna(0).astype(df[value].dtype)
+    return df
+
+
+def _dataset(file):
+    path = _path(file)
+    return ds.dataset(path, format="feather" if path.suffix == ".feather" else "csv")
+
+
+def _query_arrow(dataset, columns, include, exclude, between, group_by, value):
+    conditions = []
+    for col, values in include.items():
+        conditions.append(ds.field(col).isin(_as_list(values)))
+    for col, values in exclude.items():
+        conditions.append(~ds.field(col).isin(_as_list(values)))
+    for col, (lo, hi) in between.items():
+        if lo is not None:
+            conditions.append(ds.field(col) >= lo)
+        if hi is not None:
+            conditions.append(ds.field(col) <= hi)
+
+    table = dataset.to_table(columns=columns, filter=functools.reduce(operator.and_, conditions) if conditions else None)
+    if group_by:
+        table = table.group_by(_as_list(group_by)).aggregate([(value, "sum")])
+        table = table.rename_columns([value if c == f"{value}_sum" else c for c in table.column_names])
+        table = table.select([*_as_list(group_by), value])
+    return table.to_pandas()
+
+
+def _query_duckdb(dataset, columns, include, exclude, between, group_by, value):
+    conditions, params = [], []
+    for col, values in include.items():
+        values = _as_list(values)
+        conditions.append(f"{_ident(col)} IN ({', '.join('?' * len(values))})")
+        params += values
+    for col, values in exclude.items():
+        values = _as_list(values)
+        conditions.append(f"{_ident(col)} NOT IN ({', '.join('?' * len(values))})")
+        params += values
+    for col, (lo, hi) in between.items():
+        if lo is not None:
+            conditions.append(f"{_ident(col)} >= ?")
+            params.append(lo)
+        if hi is not None:
+            conditions.append(f"{_ident(col)} <= ?")
+            params.append(hi)
+
+    if group_by:
+        keys = ", ".join(_ident(c) for c in _as_list(group_by))
+        sql = f"SELECT {keys}, SUM({_ident(value)})::BIGINT AS {_ident(value)} FROM dataset"
+    else:
+        sql = f"SELECT {', '.join(_ident(c) for c in columns) if columns else '*'} FROM dataset"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if group_by:
+        sql += f" GROUP BY {keys}"
+
+    # DuckDB liest das pyarrow-Dataset direkt und reicht Filter/Spalten an den Scan durch
+    with duckdb.connect() as con:
+        con.register("dataset", dataset)
+        return con.execute(sql, params).df()
+
+
+def _ident(col):
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _as_list(values):
+    if isinstance(values, str) or not hasattr(values, "__iter__"):
+        return [values]
+    return list(values)
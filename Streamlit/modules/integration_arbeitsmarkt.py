@@ -15,6 +15,7 @@ from streamlit_folium import st_folium
 import geopandas as gpd
 import numpy as np
 from collections import defaultdict
+from modules.plots import plotly_chart
 # Original-Datensatz laden
 @st.cache_data
 def load_data():
@@ -280,10 +281,7 @@ def printRegionaleKarte(merged, land, jahr, container=None):
         color_continuous_scale="Viridis"
     )
     fig.update_geos(fitbounds="locations", visible=False)
-    if container:
-        container.plotly_chart(fig)
-    else:
-        st.plotly_chart(fig)
+    plotly_chart(fig, target=container)
 
 
 # Norm und Colormap definieren (für Werte von 1 bis 100)
@@ -336,7 +334,7 @@ def show():
             title="Gesamtzahlen nach Jahr für jede Herkunft–Status-Kombination"
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
         jahre = [2015, 2024]
         df_tabelle = df_filtered[df_filtered['Jahr'].isin(jahre)]
@@ -461,7 +459,7 @@ def show():
             )
             
             fig.update_layout(legend_title_text='Gruppe - Ausprägung')
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
 
 
         elif diagramm_typ == "Gestapeltes Balkendiagramm":
@@ -488,7 +486,7 @@ def show():
                 text_auto=True  # Werte auf die Balken schreiben
             )
             fig.update_layout(title=f"Vergleich nach Altersgruppen für {jahr}")
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
 
 
 show()
\ No newline at end of file
@@ -14,6 +14,7 @@ from shapely.geometry import shape
 from streamlit_folium import st_folium
 import geopandas as gpd
 import numpy as np
+from modules.plots import plotly_chart
 # Original-Datensatz laden
 @st.cache_data
 def load_data():
@@ -306,7 +307,7 @@ def show():
         )
         fig.update_layout(hovermode="closest")
 
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
         # balkendiagram 
         st.subheader("Entwicklung der Beschäftigungsquote nach Geschlecht (2021–2023)")
 
@@ -353,7 +354,7 @@ def show():
             )
 
             fig_bar.update_layout(xaxis=dict(type='category'))
-            st.plotly_chart(fig_bar, use_container_width=True)
+            plotly_chart(fig_bar, use_container_width=True)
 
     
 
@@ -12,6 +12,8 @@ import matplotlib.colors as mcolors
 import plotly.express as px
 import plotly.graph_objects as go
 import requests
+from modules import schuldaten
+from modules.plots import plotly_chart
 
 
 def show():
@@ -154,7 +156,7 @@ def show():
             margin=dict(l=40, r=40, t=50, b=40)
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
 
     ##################################################################################################
@@ -164,14 +166,8 @@ def show():
 
         # Daten einlesen: Destatis 21111-03
         # Schüler/-innen (Deutsche, Ausländer/-innen) nach Bildungsbereichen, rechtlichem Status der Schule, Schularten und Geschlecht
-        url = "https://raw.githubusercontent.com/Antonijatzele/DSI_Abschlussprojekt/main/Daten/Integration/Bildungsintegration/Destatis_21111-03_allgemeinbildende_schulen_2021_2024_zusammengefuegt.csv"
-        df = pd.read_csv(url, sep=',')
-
-        # Vorverarbeitung
-        df = df.drop(columns=['Staatsangehoerigkeit'])
-        df = df.rename(columns={'Staatsangehoerigkeit_clean': 'Staatsangehoerigkeit'})
-        df = df[df['Bildungsbereich'] != 'Bereich unbekannt']
-        df = df[~df['Bildungsbereich'].isin(['Ohne Zuordnung', 'Vorschulbereich'])]
+        # (Einlesen und Vorverarbeitung in modules/schuldaten.py, gecacht)
+        df = schuldaten.schulen()
 
         with st.expander("DataFrame anzeigen"):
             st.dataframe(df)
@@ -219,30 +215,8 @@ def show():
                 (df_filter_basis["Bildungsbereich"] == ausgewaehlter_bildungsbereich)
             ]
 
-        # Pivot-Tabelle für Schularten-Ranking (nur für 2023/24)
-        df_temp = df[
-            (df['Geschlecht'].isin(['männlich', 'weiblich'])) &
-            (df['Bundesland'] != 'Deutschland') &
-            (df['Schuljahr'] == "2023/24") &
-            (df['Staatsangehoerigkeit'].isin(['deutsche Schüler/innen', 'ausländische Schüler/innen']))
-            ]
-
-        if "Schulart" in df_temp.columns:
-            pivot_schulart = df_temp.pivot_table(
-                index='Schulart',
-                columns='Staatsangehoerigkeit',
-                values='Schueler_innen_Anzahl',
-                aggfunc='sum',
-                fill_value=0
-            )
-
-            pivot_schulart['gesamt'] = pivot_schulart['deutsche Schüler/innen'] + pivot_schulart[
-                'ausländische Schüler/innen']
-            pivot_schulart['anteil_auslaendisch'] = (pivot_schulart['ausländische Schüler/innen'] / pivot_schulart[
-                'gesamt']) * 100
-            sortierte_schularten = pivot_schulart.sort_values(by='anteil_auslaendisch', ascending=False).index.tolist()
-        else:
-            sortierte_schularten = []
+        # Schularten-Ranking nach Ausländeranteil (nur für 2023/24)
+        sortierte_schularten = schuldaten.schulart_ranking()
 
         # Pivot-Tabelle
         pivot = df_filtered.pivot_table(
@@ -450,18 +424,8 @@ def show():
         df_filtered = df_filtered[
             ~df_filtered['Schulart'].isin(['Insgesamt', 'Keine Zuordnung zu einer Schulart möglich'])]
 
-        # Gesamtzahl aller Schüler pro Schuljahr und Schulart
-        df_gesamt = df_filtered.groupby(['Schuljahr', 'Schulart'])['Schueler_innen_Anzahl'].sum().reset_index()
-        df_gesamt.rename(columns={'Schueler_innen_Anzahl': 'Gesamt'}, inplace=True)
-
-        # Anzahl ausländischer Schüler pro Schuljahr und Schulart
-        df_auslaender = df_filtered[df_filtered['Staatsangehoerigkeit'] == 'ausländische Schüler/innen'].copy()
-        df_auslaender = df_auslaender.groupby(['Schuljahr', 'Schulart'])['Schueler_innen_Anzahl'].sum().reset_index()
-        df_auslaender.rename(columns={'Schueler_innen_Anzahl': 'Auslaendisch'}, inplace=True)
-
-        # Merge und Anteil berechnen
-        df_plot = pd.merge(df_auslaender, df_gesamt, on=['Schuljahr', 'Schulart'])
-        df_plot['Anteil'] = df_plot['Auslaendisch'] / df_plot['Gesamt'] * 100
+        # Ausländische und alle Schüler pro Schuljahr und Schulart, Anteil in %
+        df_plot = schuldaten.schulart_anteile(jahr, ausgewaehlter_bildungsbereich, selected_bundesland)
 
         # Filter nach Jahr
         df_selected = df_plot[df_plot['Schuljahr'] == jahr].copy()
@@ -510,7 +474,7 @@ def show():
                 yanchor='middle'
             )
 
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
         ######################################################
         # Nur ausländische Schüler nach Schulart und Geschlecht
@@ -574,26 +538,14 @@ def show():
             uniformtext_mode='hide'
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
 
         ###########################################
         st.subheader("Herkunftsländer")
 
         # Daten einlesen
-        url = "https://raw.githubusercontent.com/Antonijatzele/DSI_Abschlussprojekt/refs/heads/main/Daten/Integration/Bildungsintegration/Destatis_21111-08_allgemeinbildende_schulen_2021_2024_zusammengefuegt.csv"
-        df = pd.read_csv(url, sep=',')
-
-        # Nur gültige Einzelgeschlechter
-        df = df[df["Geschlecht"] != "Insgesamt"]
-        # Erste zwei Spalten löschen
-        df = df.drop(df.columns[:2], axis=1)
-
-        # 'Syrien, Arabische Republik' vereinfachen
-        df['Staatsangehoerigkeit'] = df['Staatsangehoerigkeit'].replace('Syrien, Arabische Republik', 'Syrien')
-
-        # Entferne 'Deutschland' aus Bundesland und 'Insgesamt' aus Schulart und Staatsangehörigkeit
-        df = df[df['Bundesland'] != 'Deutschland']
-        df = df[(df['Schulart'] != 'Insgesamt') & (df['Staatsangehoerigkeit'] != 'Insgesamt')]
+        # Nur Einzelgeschlechter, ohne 'Deutschland' und 'Insgesamt' (modules/schuldaten.py, gecacht)
+        df = schuldaten.herkunft()
 
         # Ursprünglichen (ungefilterten) DataFrame anzeigen
         with st.expander("DataFrame anzeigen"):
@@ -639,33 +591,8 @@ def show():
 
         # Plot Anzahl ausländischer schüler (top 10 herkunftsländer)
 
-        # Schuljahr zu Jahr umwandeln (z. B. "2021/22" → 2021)
-        df['Jahr'] = df['Schuljahr'].str[:4].astype(int)
-
-        # Grundfilter: Staatsangehörigkeit ≠ 'Insgesamt'
-        df_plot_filtered = df[df['Staatsangehoerigkeit'] != "Insgesamt"]
-
-        # Filter anwenden
-        if "Alle" not in selected_schularten:
-            df_plot_filtered = df_plot_filtered[df_plot_filtered['Schulart'].isin(selected_schularten)]
-        if "Alle" not in selected_bundeslaender:
-            df_plot_filtered = df_plot_filtered[df_plot_filtered['Bundesland'].isin(selected_bundeslaender)]
-
-        # Gruppieren nach Jahr und Staatsangehörigkeit
-        df_grouped_plot = df_plot_filtered.groupby(['Jahr', 'Staatsangehoerigkeit'], as_index=False)[
-            'auslaendische_Schueler_innen_Anzahl'].sum()
-
-        # Top 10 Herkunftsländer basierend auf gefilterten Daten
-        top10_länder = (
-            df_grouped_plot
-            .groupby('Staatsangehoerigkeit')['auslaendische_Schueler_innen_Anzahl']
-            .sum()
-            .nlargest(10)
-            .index
-        )
-
-        # Nur Top 10 für den Plot
-        df_top10_plot = df_grouped_plot[df_grouped_plot['Staatsangehoerigkeit'].isin(top10_länder)]
+        # Anzahl je Jahr (aus dem Schuljahr, z. B. "2021/22" → 2021) für die Top 10 Herkunftsländer der Auswahl
+        df_top10_plot = schuldaten.herkunft_verlauf(selected_schularten, selected_bundeslaender)
 
         # Plot erstellen
         fig = px.line(
@@ -690,7 +617,7 @@ def show():
         )
 
         # In Streamlit anzeigen
-        st.plotly_chart(fig)
+        plotly_chart(fig)
 
 
         ##########################################
@@ -764,7 +691,7 @@ def show():
             yaxis=dict(title="", color="black")
         )
 
-        st.plotly_chart(fig)
+        plotly_chart(fig)
 
         # ----------------------------- #
         # Plot 2: Top 10 Staatsangehörigkeiten
@@ -803,7 +730,7 @@ def show():
             yaxis_title=""
         )
 
-        st.plotly_chart(fig)
+        plotly_chart(fig)
 
 
 
@@ -813,25 +740,8 @@ def show():
         ##################################################################
         # Daten einlesen: Destatis 21111-12
         # Absolvierende / Abgehende (Deutsche, Ausländer/-innen) nach Abschluss-, Schularten, Klassen-/Jahrgangsstufen und Geschlecht (einschl. Externe)
-        url = "https://raw.githubusercontent.com/Antonijatzele/DSI_Abschlussprojekt/refs/heads/main/Daten/Integration/Bildungsintegration/Destatis_21111-12_allgemeinbildende_schulen_2021_2023_zusammengefuegt.csv"
-        df = pd.read_csv(url, sep=';')
-
-        # Die ersten zwei Spalten löschen
-        df = df.drop(df.columns[:2], axis=1)
-
-        # Spalte umbenennen, um das Leerzeichen loszuwerden
-        df = df.rename(columns={
-            'auslaendische_Absolvierende_und_Abgehende _Anzahl': 'auslaendische_Absolvierende_und_Abgehende_Anzahl'
-        })
-
-        # in Typ float umwandeln
-        df['Absolvierende_und_Abgehende_Anzahl'] = pd.to_numeric(
-            df['Absolvierende_und_Abgehende_Anzahl'], errors='coerce'
-        )
-
-        df['auslaendische_Absolvierende_und_Abgehende_Anzahl'] = pd.to_numeric(
-            df['auslaendische_Absolvierende_und_Abgehende_Anzahl'], errors='coerce'
-        )
+        # Spalten bereinigt, Anzahlen numerisch, Abschlüsse vereinheitlicht (modules/schuldaten.py, gecacht)
+        df = schuldaten.abschluesse()
 
         with st.expander("DataFrame anzeigen"):
             st.dataframe(df)
@@ -839,10 +749,6 @@ def show():
         #########################################################################################
         # Diagramm 4 Prozentualer Anteil der deutschen/ausländischen Absolventen nach Abschluss #
         #########################################################################################
-        df['Abschluss'] = df['Abschluss'].replace('mittlerer Abschluss', 'Mittlerer Abschluss')
-        df.loc[df[
-                   'Abschluss2'] == 'dar.: mit schulischem Teil der Fachhochschulreife', 'Abschluss'] = 'Fachhochschulreife'
-
         jahre = sorted(df['Abgangsjahr'].unique())
         selected_jahr = st.selectbox(
             "Jahr",
@@ -854,26 +760,8 @@ def show():
 
         df_filtered_12 = df[df['Abgangsjahr'] == selected_jahr]
 
-        df_filtered_12['deutsche_Absolvierende'] = df_filtered_12['Absolvierende_und_Abgehende_Anzahl'] - \
-                                                   df_filtered_12[
-                                                       'auslaendische_Absolvierende_und_Abgehende_Anzahl']
-
-        grouped = df_filtered_12.groupby("Abschluss").agg({
-            "Absolvierende_und_Abgehende_Anzahl": "sum",
-            "auslaendische_Absolvierende_und_Abgehende_Anzahl": "sum"
-        }).reset_index()
-
-        sum_auslaender = grouped["auslaendische_Absolvierende_und_Abgehende_Anzahl"].sum()
-        sum_deutsch = grouped["Absolvierende_und_Abgehende_Anzahl"].sum() - sum_auslaender
-
-        grouped["auslaender_prozent_norm"] = grouped[
-                                                 "auslaendische_Absolvierende_und_Abgehende_Anzahl"] / sum_auslaender * 100
-        grouped["deutsch_anzahl"] = grouped["Absolvierende_und_Abgehende_Anzahl"] - grouped[
-            "auslaendische_Absolvierende_und_Abgehende_Anzahl"]
-        grouped["deutsch_prozent_norm"] = grouped["deutsch_anzahl"] / sum_deutsch * 100
-
-        # *** Hier sortieren nach Ausländeranteil absteigend ***
-        grouped = grouped.sort_values(by="auslaender_prozent_norm", ascending=False).reset_index(drop=True)
+        # Summen je Abschluss, Anteile je Gruppe auf 100 % normiert, sortiert nach Ausländeranteil absteigend
+        grouped = schuldaten.abschluss_anteile(selected_jahr)
 
         #########################################################################################
         # Gruppiertes Balkendiagramm
@@ -999,7 +887,7 @@ def show():
                     height=600
                 )
 
-                st.plotly_chart(fig, use_container_width=True)
+                plotly_chart(fig, use_container_width=True)
             else:
                 st.warning("Nicht genügend Daten für prozentuale Darstellung (nur Nullwerte).")
         else:
@@ -1135,8 +1023,8 @@ def show():
         for status in status_liste:
             col1, col2 = st.columns([2, 1])
             plot, legend = create_plot_and_legend(status)
-            col1.plotly_chart(plot, use_container_width=True, key=f"{status}_plot")
-            col2.plotly_chart(legend, use_container_width=True, key=f"{status}_legend")
+            plotly_chart(plot, target=col1, use_container_width=True, key=f"{status}_plot")
+            plotly_chart(legend, target=col2, use_container_width=True, key=f"{status}_legend")
 
         ##########################################
         # Plot Anzahl der gewählten Bildungsabschlüsse nach Migrationsstatus
@@ -1193,7 +1081,7 @@ def show():
                 xaxis_title=None
             )
 
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
 
 
 if __name__ == "__main__":
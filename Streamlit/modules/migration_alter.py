@@ -1,23 +1,19 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from modules.daten import age_pyramid, age_stats
+from modules.plots import cached_chart
 
-def _stats(df):
-    # Kumulierte Anzahl an Personen
-    df_median = df.groupby("ALT")["Value"].sum().reset_index()
-    df_median['Kumulierte_Anzahl'] = df_median['Value'].cumsum()
+def _stats(counts):
+    # Kumulierte Anzahl an Personen (über beide Geschlechter, Index = Alter)
+    kumuliert = counts.sum(axis=0).cumsum()
 
-    # Gesamte Anzahl an Personen
-    total_people = df_median['Value'].sum()
-
-    # Medianalter = Punkt wo kumulierte Anzahl > Gesamte Anzahl / 2
-    median_age_row = df_median[df_median['Kumulierte_Anzahl'] >= total_people / 2].iloc[0]
-    median_age = median_age_row['ALT']
+    # Medianalter = erstes Alter, bei dem die kumulierte Anzahl >= Gesamte Anzahl / 2
+    median_age = int(np.searchsorted(kumuliert, kumuliert[-1] / 2, side="left"))
 
     #Verhältnis der Geschlechter
-    men = df[df["GES"] == "GESM"]["Value"].sum()
-    women = df[df["GES"] == "GESW"]["Value"].sum()
+    men, women = counts.sum(axis=1)
 
     if men > women:
         sex_ratio = f"{men/women:.2f} zu 1"
@@ -29,111 +25,176 @@ def _stats(df):
 
 
 
-def show():
-    altersreihenfolge = list(range(85))
-
-    def load_and_prepare_data(file_path, filter):
-        df = pd.read_csv(file_path)
+# Pyramide einer Gruppe über alle Stichtage als Plotly-Animation (abspielen/schieben im Browser, ohne Rerun)
+# Die Frames enthalten nur die Werte (x) je Geschlecht; Alter (y), Farben und Achsen stehen einmal in der Figur
+def _animation(pyramide, group):
+    counts = pyramide.counts[pyramide.groups.get_loc(group)]
+    alter = np.arange(counts.shape[-1])
+    stichtage = [d.strftime("%Y") for d in pyramide.dates]
+    grenze = counts.max() * 1.05
 
-        if filter:
-            gruppen = df["Ländergruppierungen"].unique()
-            selected_group = st.selectbox(f"Wähle eine Ländergruppierung (Ausländer)", sorted(gruppen, key= lambda x: "$" if x=="Insgesamt" else x))
-            df = df[df["Ländergruppierungen"] == selected_group]
-        else:
-            selected_group = "Deutsche"
-            df = df
-        
-        # Alter nur bis 84 anzeigen
-        df = df[df["ALT"].isin(altersreihenfolge)]
+    fig = go.Figure(
+        data=[
+            go.Bar(y=alter, x=-counts[0, 0], name='Männer', orientation='h', marker=dict(color='steelblue')),
+            go.Bar(y=alter, x=counts[0, 1], name='Frauen', orientation='h', marker=dict(color='lightcoral')),
+        ],
+        frames=[
+            go.Frame(name=name, data=[go.Bar(x=-frame[0]), go.Bar(x=frame[1])], traces=[0, 1])
+            for name, frame in zip(stichtage, counts)
+        ],
+    )
 
-        #Männer und Frauen trennen
-        df_men = df[df["GES"] == "GESM"].set_index("ALT")["Value"].reindex(altersreihenfolge).fillna(0)
-        df_women = df[df["GES"] == "GESW"].set_index("ALT")["Value"].reindex(altersreihenfolge).fillna(0)
+    # Abspielen/Anhalten und Schieberegler über die Stichtage
+    schritt = {"mode": "immediate", "frame": {"duration": 0, "redraw": False}, "transition": {"duration": 0}}
+    fig.update_layout(
+        height=700,
+        barmode='overlay',
+        bargap=0.1,
+        xaxis=dict(range=[-grenze, grenze], tickvals=[], ticktext=[]),
+        yaxis=dict(title='Alter (95 = 95 und älter)'),
+        title=f"Alterspyramide {group} {stichtage[0]} bis {stichtage[-1]}",
+        updatemenus=[dict(
+            type="buttons",
+            direction="left",
+            x=0, xanchor="left", y=0, yanchor="top", pad={"t": 50},
+            buttons=[
+                dict(label="▶", method="animate", args=[None, {
+                    "frame": {"duration": 500, "redraw": False},
+                    "transition": {"duration": 300},
+                    "fromcurrent": True,
+                }]),
+                dict(label="❚❚", method="animate", args=[[None], schritt]),
+            ],
+        )],
+        sliders=[dict(
+            active=0,
+            x=0.1, len=0.9, y=0, yanchor="top", pad={"t": 50},
+            currentvalue={"prefix": "Stichtag: "},
+            steps=[dict(label=name, method="animate", args=[[name], schritt]) for name in stichtage],
+        )],
+    )
+    return fig
 
-        return df_men, df_women, selected_group, df
 
-    # Titel
-    st.header("Alterverteilung im Vergleich")
 
 
-    # Ausländer
-    file_path_ausl = "Streamlit/data/migration/alterspyramide.csv"
-    df_men_ausl, df_women_ausl, selected_group_ausl, df_ausl = load_and_prepare_data(file_path_ausl, True )
+def show():
+    # Alter nur bis 84 anzeigen
+    max_alter = 84
+    altersreihenfolge = list(range(max_alter + 1))
 
-    # Deutsche
-    file_path_de = "Streamlit/data/migration/alterspyramide_de.csv"
-    df_men_de, df_women_de, selected_group_de, df_de = load_and_prepare_data(file_path_de, False)
+    # (Gruppe x Geschlecht x Alter) einmal geladen, Auswahl ist danach nur ein Ausschnitt
+    pyramide_ausl = age_pyramid("alterspyramide.csv", "Ländergruppierungen")
+    pyramide_de = age_pyramid("alterspyramide_de.csv")
 
+    # Titel
+    st.header("Alterverteilung im Vergleich")
 
-    fig = make_subplots(
-        rows=1, cols=2,
-        shared_yaxes=True,
-        horizontal_spacing=0.05,
-        subplot_titles=(f"Ausländer ({selected_group_ausl})", "Deutsche")
-    )
 
-    # Ausländer
-    fig.add_trace(go.Bar(
-        y=altersreihenfolge,
-        x=-df_men_ausl.values,
-        name='Männer',
-        orientation='h',
-        marker=dict(color='steelblue'),
-        showlegend=False
-    ), row=1, col=1)
-
-    fig.add_trace(go.Bar(
-        y=altersreihenfolge,
-        x=df_women_ausl.values,
-        name='Frauen',
-        orientation='h',
-        marker=dict(color='lightcoral'),
-        showlegend=False
-    ), row=1, col=1)
-
-    # Deutsche
-    fig.add_trace(go.Bar(
-        y=altersreihenfolge,
-        x=-df_men_de.values,
-        name='Männer',
-        orientation='h',
-        marker=dict(color='steelblue'),
-        showlegend=False
-    ), row=1, col=2)
-
-    fig.add_trace(go.Bar(
-        y=altersreihenfolge,
-        x=df_women_de.values,
-        name='Frauen',
-        orientation='h',
-        marker=dict(color='lightcoral'),
-        showlegend=False
-    ), row=1, col=2)
-
-    #Stats
-    median_ausl, sex_ratio_ausl = _stats(df_ausl)
-    median_de, sex_ratio_de = _stats(df_de)
-
-    # Layout
-    fig.update_layout(
-        height=800,
-        barmode='overlay',
-        bargap=0.1,
-        xaxis=dict(
-            title=f'Medianalter: {median_ausl}, Verhältnis (M/W): {sex_ratio_ausl}',
-            tickvals=[],
-            ticktext=[]
-        ),
-        xaxis2=dict(
-            title=f'Medianalter: {median_de}, Verhältnis (M/W): {sex_ratio_de}',
-            tickvals=[],
-            ticktext=[]
-        ),
-        yaxis=dict(title='Alter'),
-        title="Alterspyramiden: Ausländer vs. Deutsche"
+    # Ausländer: Ländergruppierung wählen (Widget vor dem Figuren-Cache, die Auswahl ist Teil des Schlüssels)
+    selected_group_ausl = st.selectbox(f"Wähle eine Ländergruppierung (Ausländer)", sorted(pyramide_ausl.groups, key= lambda x: "$" if x=="Insgesamt" else x))
+
+    def build():
+        # Ausländer / Deutsche: Zeile 0 Männer, Zeile 1 Frauen
+        ausl = pyramide_ausl.get(selected_group_ausl, bis=max_alter)
+        de = pyramide_de.get(bis=max_alter)
+
+
+        fig = make_subplots(
+            rows=1, cols=2,
+            shared_yaxes=True,
+            horizontal_spacing=0.05,
+            subplot_titles=(f"Ausländer ({selected_group_ausl})", "Deutsche")
+        )
+
+        # Ausländer
+        fig.add_trace(go.Bar(
+            y=altersreihenfolge,
+            x=-ausl[0],
+            name='Männer',
+            orientation='h',
+            marker=dict(color='steelblue'),
+            showlegend=False
+        ), row=1, col=1)
+
+        fig.add_trace(go.Bar(
+            y=altersreihenfolge,
+            x=ausl[1],
+            name='Frauen',
+            orientation='h',
+            marker=dict(color='lightcoral'),
+            showlegend=False
+        ), row=1, col=1)
+
+        # Deutsche
+        fig.add_trace(go.Bar(
+            y=altersreihenfolge,
+            x=-de[0],
+            name='Männer',
+            orientation='h',
+            marker=dict(color='steelblue'),
+            showlegend=False
+        ), row=1, col=2)
+
+        fig.add_trace(go.Bar(
+            y=altersreihenfolge,
+            x=de[1],
+            name='Frauen',
+            orientation='h',
+            marker=dict(color='lightcoral'),
+            showlegend=False
+        ), row=1, col=2)
+
+        #Stats
+        median_ausl, sex_ratio_ausl = _stats(ausl)
+        median_de, sex_ratio_de = _stats(de)
+
+        # Layout
+        fig.update_layout(
+            height=800,
+            barmode='overlay',
+            bargap=0.1,
+            xaxis=dict(
+                title=f'Medianalter: {median_ausl}, Verhältnis (M/W): {sex_ratio_ausl}',
+                tickvals=[],
+                ticktext=[]
+            ),
+            xaxis2=dict(
+                title=f'Medianalter: {median_de}, Verhältnis (M/W): {sex_ratio_de}',
+                tickvals=[],
+                ticktext=[]
+            ),
+            yaxis=dict(title='Alter'),
+            title="Alterspyramiden: Ausländer vs. Deutsche"
+        )
+        return fig
+
+    cached_chart("alterspyramide", ["alterspyramide.csv", "alterspyramide_de.csv"], [selected_group_ausl], build,
+                 use_container_width=True)
+
+    # Entwicklung der gewählten Gruppe über alle Stichtage (alle Frames auf einmal, Abspielen ohne Rerun)
+    st.subheader(f"Entwicklung: {selected_group_ausl}")
+    pyramide_zeit = age_pyramid("alter_stichtage.csv", "Ländergruppierungen", "STAG")
+    cached_chart("alterspyramide_animation", ["alter_stichtage.csv"], [selected_group_ausl],
+                 lambda: _animation(pyramide_zeit, selected_group_ausl), use_container_width=True)
+
+    # Jüngste/älteste ausländische Bevölkerungsgruppen (alle Gruppen und Stichtage einmal berechnet und gecacht)
+    st.subheader("Jüngste und älteste ausländische Bevölkerungsgruppen")
+    stats = age_stats("alter_stichtage.csv", "Ländergruppierungen", "STAG")
+    stichtage = sorted(stats["Stichtag"].unique(), reverse=True)
+    stichtag = st.selectbox("Stichtag", stichtage, format_func=lambda d: d.strftime("%d.%m.%Y"))
+    tabelle = stats[stats["Stichtag"] == stichtag].drop(columns="Stichtag").sort_values("Median")
+    st.dataframe(
+        tabelle,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Durchschnittsalter": st.column_config.NumberColumn(format="%.1f"),
+            "Männer je Frau": st.column_config.NumberColumn(format="%.2f"),
+        },
     )
-
-    st.plotly_chart(fig, use_container_width=True)
+    st.caption("Spalten zum Sortieren anklicken. P10 bis P90: Alter, unter dem 10 % bis 90 % der Personen liegen; "
+               "95 steht für 95 Jahre und älter.")
 
 
     st.markdown("Quelle: [Destatis - Ausländerstatistik](https://www-genesis.destatis.de/datenbank/online/statistic/12521/details)")
@@ -11,11 +11,11 @@ def show():
     ])
     with tab1:
         default_groups = ["Insgesamt", "Afrika", "Asien", "Europa", "Amerika"]
-        simple_timeline("einbürg_ländergruppen.csv", "Ländergruppierungen", default_groups, running_sum=True)
+        simple_timeline("einbürg_ländergruppen.csv", "Ländergruppierungen", default_groups, running_sum=True, client_filter=True)
 
     with tab2:
         default_groups = ['Türkei', 'Italien', 'Ukraine', 'Syrien', 'Afghanistan']
-        simple_timeline("einbürg_staaten.csv", "Staatsangehörigkeit", default_groups, running_sum=True)
+        simple_timeline("einbürg_staaten.csv", "Staatsangehörigkeit", default_groups, running_sum=True, client_filter=True)
         simple_piechart("einbürg_staaten.csv", "Staatsangehörigkeit", True)
 
     with tab3:
@@ -1,7 +1,8 @@
 import streamlit as st
 from streamlit_folium import st_folium
 import plotly.express as px
-import pandas as pd
+from modules.daten import load_dataset
+from modules.plots import plotly_chart
 
 
 
@@ -14,8 +15,7 @@ def show():
         # Titel
         st.subheader("Bevölkerungsdichte vs. Ausländeranteil")
 
-        csv_path = "Streamlit/data/migration/scatter_plot_anteil_dichte.csv"
-        df = pd.read_csv(csv_path)
+        df = load_dataset("scatter_plot_anteil_dichte.csv")
 
         # Dropdown-Menü für Aufenthaltstitel
         titel_options = ["insgesamt"] + sorted(df["Staatsangehörigkeit"].dropna().unique().tolist())
@@ -50,11 +50,11 @@ def show():
             height=700,
         )
 
-        st.plotly_chart(fig, use_container_width=False)
+        plotly_chart(fig, use_container_width=False)
 
     with tab2:
         # Korrealtionsdisgram
-        df_corr = pd.read_csv("Streamlit/data/migration/scatter_plot_anteil_dichte_corr.csv")
+        df_corr = load_dataset("scatter_plot_anteil_dichte_corr.csv")
         
         fig = px.bar(
             df_corr.sort_values(by='Correlation'), 
@@ -66,7 +66,7 @@ def show():
         fig.update_layout(
             height=1200
         )
-        st.plotly_chart(fig)
+        plotly_chart(fig)
 
 
 
@@ -1,59 +1,348 @@
+import base64
+import json
+import threading
+from collections import OrderedDict
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
+from modules.daten import TOP_N, dataset_version, prefix_sums, query, rollup
 
+# Ab so vielen Punkten im Diagramm wird mit WebGL (Scattergl) statt SVG gezeichnet
+WEBGL_POINTS = 5_000
 
-def simple_timeline(file, group_col, default_groups=None, running_sum=False):
-    df = _read_csv(file)
+# Downsampling (downsample=True): Punkte je Pixel Diagrammbreite, verteilt auf alle Linien,
+# aber mindestens MIN_POINTS je Linie
+CHART_WIDTH = 1000
+POINTS_PER_PIXEL = 2
+MIN_POINTS = 50
 
-    fig = go.Figure()
+# Obergrenze für den Figuren-Cache (serialisiertes JSON aller Figuren zusammen)
+FIGURE_CACHE_MB = 64
+
+# Zahlen an den Browser: so viele signifikante Stellen, gemessen am größten Betrag der Datenreihe in der Einheit
+# der Figur (dort nie gröber als ganze Zahlen). Anzahlen bleiben nur exakt, wenn sie nicht umgerechnet sind:
+# simple_timeline rechnet in Tsd./Mio um, dann wird bewusst auf Anzeige-Genauigkeit gerundet (bei 1-10 Mio als
+# Maximum 13.647 -> 0,01365 Mio = 13.650), bei einem Maximum unter 1.000 mindestens 10x feiner als der Hover mit
+# zwei Nachkommastellen
+SIGNIFICANT_DIGITS = 6
+
+# Gesendete Diagramm-Bytes des aktuellen Durchlaufs (st.session_state), in app.py zurückgesetzt (reset_payload)
+PAYLOAD_KEY = "chart_payload"
+
+# Trace-Attribute, deren Zahlenlisten Datenreihen sind (andere Listen wie domain.x bleiben, wie sie sind)
+DATA_ARRAYS = {"x", "y", "z", "values", "r", "theta", "lat", "lon", "customdata", "open", "high", "low", "close"}
+
+# Kleinste Typed-Array-Typen (plotly.js-Kürzel), die Ganzzahlen verlustfrei fassen
+INT_TYPES = [("i1", np.int8), ("u1", np.uint8), ("i2", np.int16), ("u2", np.uint16), ("i4", np.int32), ("u4", np.uint32)]
+
+
+# Fertige Figuren als (kompaktes JSON, Bytes ohne Optimierung), über alle Sitzungen geteilt; älteste Einträge
+# fliegen raus, wenn das JSON zusammen max_bytes überschreitet (LRU)
+class FigureCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if len(entry[0]) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key)[0])
+            self.entries[key] = entry
+            self.size += len(entry[0])
+            while self.size > self.max_bytes:
+                self.size -= len(self.entries.popitem(last=False)[1][0])
+
+
+@st.cache_resource(show_spinner=False)
+def figure_cache():
+    return FigureCache(FIGURE_CACHE_MB * 1024 * 1024)
+
+
+# Figur anzeigen, ohne sie bei gleicher Auswahl neu zu bauen
+# name: Diagramm (eindeutig je Stelle im Code), files: verwendete Datensätze (deren Stand gehört zum Schlüssel),
+# selection: alles, was die Figur beeinflusst (Widget-Werte, Parameter), build: erzeugt die go.Figure bei Cache-Miss
+# Restliche Argumente gehen an st.plotly_chart
+def cached_chart(name, files, selection, build, **kwargs):
+    key = json.dumps([name, [dataset_version(f) for f in files], selection], default=_plain)
+    cache = figure_cache()
+    entry = cache.get(key)
+    if entry is None:
+        fig = build()
+        # Rohgröße nur beim Messen (kostet eine zusätzliche Serialisierung)
+        entry = (pio.to_json(compact_figure(fig), validate=False), _payload_bytes(fig) if _measuring() else None)
+        cache.put(key, entry)
+    fig_json, raw_bytes = entry
+    if _measuring():
+        sent_bytes = len(fig_json.encode("utf8"))
+        # Eintrag ohne Messung gebaut: Rohgröße unbekannt, zählt wie gesendet
+        _record_payload(sent_bytes if raw_bytes is None else raw_bytes, sent_bytes)
+    st.plotly_chart(json.loads(fig_json), **kwargs)
+
+
+# Ersatz für st.plotly_chart: sendet die kompakte Figur (siehe compact_figure) und zählt die Bytes mit
+# target: Container, in dem das Diagramm erscheint (z.B. Spalte aus st.columns), sonst st
+def plotly_chart(fig, target=None, **kwargs):
+    fig_dict = compact_figure(fig)
+    if _measuring():
+        _record_payload(_payload_bytes(fig), _payload_bytes(fig_dict))
+    (target or st).plotly_chart(fig_dict, **kwargs)
+
+
+# Figur als dict für den Browser verkleinern:
+# - Zahlenreihen auf SIGNIFICANT_DIGITS runden und als kleinstes passendes Typed Array (base64) schicken
+# - Stichtage ohne Uhrzeit ("2000-12-31" statt "2000-12-31T00:00:00")
+# - aus der Vorlage (template.data) nur die Voreinstellungen der vorkommenden Trace-Typen behalten
+# Animations-Frames werden wie data behandelt
+def compact_figure(fig):
+    fig_dict = fig if isinstance(fig, dict) else fig.to_plotly_json()
+    layout = dict(fig_dict.get("layout", {}))
+    data = [_compact_trace(trace) for trace in fig_dict.get("data", [])]
+
+    template = layout.get("template")
+    if isinstance(template, dict) and "data" in template:
+        types = {trace.get("type", "scatter") for trace in data}
+        layout["template"] = {**template, "data": {t: v for t, v in template["data"].items() if t in types}}
+
+    result = {**fig_dict, "data": data, "layout": layout}
+    if fig_dict.get("frames"):
+        result["frames"] = [{**frame, "data": [_compact_trace(trace) for trace in frame.get("data", [])]}
+                            for frame in fig_dict["frames"]]
+    return result
+
+
+def _compact_trace(trace):
+    return {k: _compact(v, k in DATA_ARRAYS) for k, v in trace.items()}
+
+
+# Typed Arrays und numpy-Arrays immer, einfache Zahlenlisten nur bei Datenreihen (data_array)
+def _compact(value, data_array=False):
+    if isinstance(value, dict):
+        if "bdata" in value and "dtype" in value:
+            return _typed_array(_decode_array(value))
+        return {k: _compact(v) for k, v in value.items()}
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in "iuf":
+            return _typed_array(value)
+        if value.dtype.kind == "M" and (value == value.astype("datetime64[D]")).all():
+            return np.datetime_as_string(value, unit="D").tolist()
+        return value
+    if isinstance(value, (list, tuple)) and value:
+        if data_array and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+            return _typed_array(np.asarray(value))
+        if all(isinstance(v, str) and v.endswith("T00:00:00") for v in value):
+            return [v[:-len("T00:00:00")] for v in value]
+        return [_compact(v) for v in value]
+    return value
+
+
+def _decode_array(spec):
+    values = np.frombuffer(base64.b64decode(spec["bdata"]), dtype=np.dtype(spec["dtype"]).newbyteorder("<"))
+    if "shape" in spec:
+        values = values.reshape([int(n) for n in str(spec["shape"]).split(",")])
+    return values
+
+
+# Runden (siehe SIGNIFICANT_DIGITS) und kleinsten Typ wählen: Ganzzahlen als i1..u4, sonst float32 (genügt für
+# SIGNIFICANT_DIGITS, ab 2**24 nicht mehr auf ganze Zahlen genau, dann float64)
+def _typed_array(values):
+    values = np.asarray(values)
+    if values.size == 0:
+        return values.tolist()
+
+    if values.dtype.kind == "f":
+        finite = np.isfinite(values)
+        top = np.abs(values[finite]).max() if finite.any() else 0
+        if top > 0:
+            values = np.round(values, max(0, SIGNIFICANT_DIGITS - 1 - int(np.floor(np.log10(top)))))
+        if not finite.all() or not np.array_equal(values, np.trunc(values)):
+            return _encode_array("f4", values.astype("<f4")) if top < 2**24 else _encode_array("f8", values.astype("<f8"))
+
+    lo, hi = values.min(), values.max()
+    for code, dtype in INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return _encode_array(code, values.astype(np.dtype(dtype).newbyteorder("<")))
+    return _encode_array("f8", values.astype("<f8"))
+
+
+def _encode_array(code, values):
+    spec = {"dtype": code, "bdata": base64.b64encode(values.tobytes()).decode("ascii")}
+    if values.ndim > 1:
+        spec["shape"] = ",".join(str(n) for n in values.shape)
+    return spec
+
+
+# Größe der Figur, wie Streamlit sie an den Browser schickt (JSON-Spec im Protobuf)
+def _payload_bytes(fig):
+    return len(pio.to_json(fig, validate=False).encode("utf8"))
+
+
+# Messen nur auf Wunsch (URL-Parameter ?payload), sonst kostet es eine zusätzliche Serialisierung je Diagramm
+def _measuring():
+    return "payload" in st.query_params
+
+
+# Zähler zu Beginn jedes Durchlaufs zurücksetzen (app.py)
+def reset_payload():
+    st.session_state[PAYLOAD_KEY] = {"diagramme": 0, "roh": 0, "gesendet": 0}
+
+
+def _record_payload(raw_bytes, sent_bytes):
+    if PAYLOAD_KEY not in st.session_state:
+        reset_payload()
+    stats = st.session_state[PAYLOAD_KEY]
+    stats["diagramme"] += 1
+    stats["roh"] += raw_bytes
+    stats["gesendet"] += sent_bytes
 
-    # Auswahl treffen
-    all_groups = df[group_col].unique()
-    if default_groups:
+
+# Zusammenfassung für den aktuellen Durchlauf (app.py zeigt sie bei ?payload in der Seitenleiste)
+def payload_summary():
+    if PAYLOAD_KEY not in st.session_state:
+        reset_payload()
+    stats = st.session_state[PAYLOAD_KEY]
+    return (f"Diagramme: {stats['diagramme']}, ohne Optimierung {stats['roh'] / 1024:,.1f} KB, "
+            f"gesendet {stats['gesendet'] / 1024:,.1f} KB")
+
+
+# Widget-Werte vereinheitlichen (numpy-Zahlen, Index/Arrays, Mengen), damit gleiche Auswahl gleichen Schlüssel ergibt
+def _plain(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+# downsample: jede Linie formerhaltend (LTTB) auf ein Punktbudget reduzieren, das sich aus width
+# (Diagrammbreite in Pixeln) und der Anzahl Linien ergibt; über "Zeitraum" wird hineingezoomt,
+# der engere Zeitraum wird neu reduziert und passt er ins Budget, kommen alle Punkte mit
+# client_filter (mit default_groups): statt Multiselect alle Gruppen als Linien schicken, sichtbar sind
+# default_groups; ein-/ausblenden über die Legende bzw. Knöpfe im Browser, ohne Rerun
+def simple_timeline(file, group_col, default_groups=None, running_sum=False, webgl_points=WEBGL_POINTS,
+                    downsample=False, width=CHART_WIDTH, client_filter=False):
+    key = f"{file}_{group_col}"
+    visible = None
+
+    # Auswahl treffen (Widgets zuerst: ihre Werte bilden den Schlüssel für den Figuren-Cache)
+    if default_groups and client_filter:
+        sel_groups = list(prefix_sums(file, group_col).groups)
+        visible = list(default_groups)
+        n = None
+    elif default_groups:
         sel_groups = st.multiselect(
             label=f"{group_col} auswählen",
-            options=all_groups,
-            default=default_groups if default_groups else all_groups,
-            key=f"timeline_{file}_{group_col}"
+            options=prefix_sums(file, group_col).groups,
+            default=default_groups,
+            key=f"timeline_{key}"
         )
+        n = None
     else:
-        df = _shorten_df(df, group_col)
+        sel_groups = None
+        n = _top_n_slider(key=f"topn_timeline_{key}")
+
+    summe = running_sum and st.checkbox('Laufende Summe', key=f"cb_rs_timeline_{key}")
+
+    # Zoom hängt von der Punktzahl ab, dafür werden die Daten schon vor dem Cache gebraucht
+    data, zoom = None, None
+    if downsample:
+        data = _timeline_data(file, group_col, sel_groups, n, summe)
+        zoom = _zoom_slider(data[0], width, key=f"zoom_timeline_{key}")
+
+    def build():
+        parts, sel, einheit = data or _timeline_data(file, group_col, sel_groups, n, summe)
+        return _timeline_figure(parts, sel, einheit, group_col, webgl_points, width, zoom, visible)
+
+    selection = [group_col, sel_groups, n, summe, webgl_points, downsample, width, zoom, visible]
+    cached_chart("timeline", [file], selection, build, use_container_width=True)
+
+
+# Linien je Gruppe (ein groupby-Durchlauf), Reihenfolge der Legende und Einheit
+def _timeline_data(file, group_col, sel_groups, n, summe):
+    if sel_groups is None:
+        df = rollup(file, group_col, n=n)
         sel_groups = df[group_col].unique()
+    else:
+        # Nur die Zeilen der gewählten Gruppen lesen (Filter im Scan, siehe daten.query)
+        df = query(file, columns=["Jahr", group_col, "Value"], include={group_col: list(sel_groups)})
 
-    # Laufende Summe
-    if running_sum:
-        if st.checkbox('Laufende Summe', key=f"cb_rs_timeline_{file}_{group_col}"):
-            df['Value'] = df.groupby(group_col)['Value'].cumsum()
+    # Laufende Summe (vorberechnete kumulierte Summen je Gruppe und Jahr)
+    if summe:
+        df['Value'] = prefix_sums(file, group_col).lookup(df[group_col], df['Jahr'])
 
     # Einheit
-    df_filtered = df[df[group_col].isin(sel_groups)]
-    max_value = df_filtered["Value"].max()
+    max_value = df["Value"].max()
     einheit = ""
     if max_value > 1_000_000:
-        df["Value"] = df["Value"] / 1_000_000
+        df = df.assign(Value=df["Value"] / 1_000_000)
         einheit = "Mio"
     elif max_value > 1_000:
-        df["Value"] = df["Value"] / 1_000
+        df = df.assign(Value=df["Value"] / 1_000)
         einheit = "Tsd."
-    
+
+    # Gruppen in einem Durchlauf aufteilen (statt je Gruppe den ganzen DataFrame zu filtern)
+    parts = {group: subset for group, subset in df.groupby(group_col, observed=True, sort=False)}
+    return parts, sel_groups, einheit
+
+
+# visible: nur diese Gruppen anfangs zeigen, die übrigen stehen ausgegraut in der Legende (None = alle zeigen)
+def _timeline_figure(parts, sel_groups, einheit, group_col, webgl_points, width, zoom, visible=None):
+    fig = go.Figure()
+
     # Y-Achse
     yaxis_title="Bevölkerung"
     if einheit:
         yaxis_title += f" (in {einheit})"
 
     # Diagrame ersetllen
+    if zoom:
+        parts = _downsample_parts(parts, width, zoom)
+    empty = pd.DataFrame({"Jahr": [], "Value": []})
+    # WebGL nur nach den anfangs sichtbaren Linien (ausgeblendete zeichnet der Browser erst beim Einschalten)
+    shown = [group for group in sel_groups if visible is None or group in visible]
+    points = sum(len(parts[group]) for group in shown if group in parts)
+    trace = go.Scattergl if points > webgl_points else go.Scatter
     for group in sel_groups:
-        subset = df[df[group_col] == group]
-        fig.add_trace(go.Scatter(
+        subset = parts.get(group, empty)
+        fig.add_trace(trace(
             x=subset["Jahr"],
             y=subset["Value"],
             mode="lines+markers",
             name=group,
-            hovertemplate=f"<b>{group}</b><br>Bevölkerung: %{{y:.2f}} {einheit}<extra></extra>"
+            hovertemplate=f"<b>{group}</b><br>Bevölkerung: %{{y:.2f}} {einheit}<extra></extra>",
+            visible=True if visible is None or group in visible else "legendonly"
         ))
 
+    # Auswahl im Browser umschalten (restyle ändert nur die Sichtbarkeit, kein Rerun)
+    if visible is not None:
+        auswahl = [True if group in visible else "legendonly" for group in sel_groups]
+        fig.update_layout(updatemenus=[dict(
+            type="buttons",
+            direction="right",
+            x=0, xanchor="left", y=1.12, yanchor="bottom",
+            buttons=[
+                dict(label="Auswahl", method="restyle", args=[{"visible": auswahl}]),
+                dict(label="Alle", method="restyle", args=[{"visible": [True] * len(sel_groups)}]),
+                dict(label="Keine", method="restyle", args=[{"visible": ["legendonly"] * len(sel_groups)}]),
+            ]
+        )])
+
     fig.update_layout(
         title="",
         xaxis_title="Jahr",
@@ -62,79 +351,110 @@ def simple_timeline(file, group_col, default_groups=None, running_sum=False):
         legend_title=group_col,
         template="plotly_white"
     )
-
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
 def simple_piechart(file, col, sum=False):
-    df = _read_csv(file)
-
+    jahre = prefix_sums(file, col).years
 
     # Jahr filtern bzw. Summe bilden
     selected_year = st.slider(
         'Jahr auswählen', 
-        min_value=df['Jahr'].min(), 
-        max_value=df['Jahr'].max(), 
-        value=df['Jahr'].max(),
+        min_value=jahre[0], 
+        max_value=jahre[-1], 
+        value=jahre[-1],
         key=f"piechart_{file}_{col}"
     )
+    n = _top_n_slider(key=f"topn_piechart_{file}_{col}")
 
-    if sum:
-        filtered_df = df[df['Jahr'] <= selected_year]
-        filtered_df = filtered_df.groupby(col)["Value"].sum().reset_index()
-        filtered_df["Jahr"] =  selected_year
-    else:
-        filtered_df = df[df['Jahr'] == selected_year]
+    def build():
+        if sum:
+            final_df = prefix_sums(file, col).at(selected_year, n)
+            final_df["Jahr"] = selected_year
+        else:
+            final_df = rollup(file, col, selected_year, selected_year, n)
 
-    final_df = _shorten_df(filtered_df, col)
+        # Prozent berechnen
+        total_value = final_df['Value'].sum()
+        final_df['Prozent'] = (final_df['Value'] / total_value) * 100
 
-    # Prozent berechnen
-    total_value = final_df['Value'].sum()
-    final_df['Prozent'] = (final_df['Value'] / total_value) * 100
+        # Titel anpassen
+        if sum:
+            title = f"Summe Jahr {jahre[0]} bis {selected_year}"
+        else:
+            title = f"Jahr {selected_year}"
 
-    # Titel anpassen
-    if sum:
-        title = f"Summe Jahr {df['Jahr'].min()} bis {selected_year}"
-    else:
-        title = f"Jahr {selected_year}"
-
-    # Diagram erstellen und anzeigen
-    fig = px.pie(
-        final_df, 
-        names=col, 
-        values='Prozent', 
-        title=title,
+        # Diagram erstellen
+        fig = px.pie(
+            final_df, 
+            names=col, 
+            values='Prozent', 
+            title=title,
+        )
+        fig.update_layout(
+            legend_title_text=col,
+        ) 
+        return fig
+
+    cached_chart("piechart", [file], [col, selected_year, n, sum], build)
+
+
+# Anzahl einzeln gezeigter Gruppen, der Rest wird zu "Andere" zusammengefasst
+def _top_n_slider(key):
+    return st.slider("Anzahl einzeln gezeigter Gruppen", min_value=3, max_value=25, value=TOP_N, key=key)
+
+
+# Punktbudget je Linie aus Diagrammbreite und Anzahl Linien
+def _point_budget(width, n_series):
+    return max(MIN_POINTS, int(width * POINTS_PER_PIXEL) // max(n_series, 1))
+
+
+# Sind Linien über dem Budget, wird ein Zeitraum gewählt (von, bis), sonst None
+def _zoom_slider(parts, width, key):
+    budget = _point_budget(width, len(parts))
+    if all(len(subset) <= budget for subset in parts.values()):
+        return None
+
+    jahre = np.unique(np.concatenate([subset["Jahr"].to_numpy() for subset in parts.values()]))
+    von, bis = st.select_slider(
+        "Zeitraum (hineinzoomen für alle Punkte)",
+        options=jahre.tolist(),
+        value=(jahre[0].item(), jahre[-1].item()),
+        key=key
     )
-    fig.update_layout(
-        legend_title_text=col,
-    ) 
-    st.plotly_chart(fig)
-
-
-def _read_csv(file):
-    csv_path = f"Streamlit/data/migration/{file}"
-    df = pd.read_csv(csv_path, sep=None, engine='python')
-    if 'STAG' in df.columns:
-        df["Jahr"] = pd.to_datetime(df["STAG"]).dt.year
-    return df
-
-def _shorten_df(df, col):
-    df_sum = df.groupby(col)["Value"].sum().reset_index()
-    # Wenn es mehr als 10 Einträge gibt -> zusammenfassen
-    if len(df_sum) > 10:
-        # Sortiere nach Value, und wähle die Top 10
-        df_sorted = df_sum.sort_values(by='Value', ascending=False)
-        top10 = df_sorted.head(10)[col]
-
-        # Filter die Top10
-        df_top10 = df[df[col].isin(top10)]
-
-        # Nicht top10 -> Andere
-        df_not_top10 = df[~df[col].isin(top10)].groupby(["Jahr"])["Value"].sum().reset_index()
-        df_not_top10[col] = "Andere"
- 
-        return pd.concat([df_top10, df_not_top10])
-    else:
-        return df
+    return von, bis
+
+
+# Linien auf den Zeitraum beschränken und mit LTTB aufs Budget reduzieren
+def _downsample_parts(parts, width, zoom):
+    budget = _point_budget(width, len(parts))
+    von, bis = zoom
+    result = {}
+    for group, subset in parts.items():
+        subset = subset[subset["Jahr"].between(von, bis)]
+        result[group] = subset.iloc[_lttb(subset["Jahr"].to_numpy(), subset["Value"].to_numpy(), budget)]
+    return result
+
+
+# Largest-Triangle-Three-Buckets: Positionen der n_out Punkte, die die Form der Linie am besten erhalten
+# (erster und letzter Punkt bleiben, je Bucket der Punkt mit der größten Dreiecksfläche)
+def _lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
 
-    
\ No newline at end of file
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
@@ -0,0 +1,456 @@
+import argparse
+import io
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import requests
+import streamlit as st
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# Transformationsketten der Schul-Datensätze (Destatis 21111-03/-08/-12) für integration_bildung.py
+# Zwei Backends mit gleichem Ergebnis (immer pandas):
+#   "pandas": die bisherigen Schritte, jeder Schritt erzeugt einen neuen DataFrame
+#   "polars": LazyFrame, die ganze Kette wird optimiert und einmal (mehrere Kerne) ausgeführt
+# Standard ist polars (steht in requirements.txt; fehlt es, läuft pandas); umstellen über die
+# Umgebungsvariable DASHBOARD_BACKEND
+#
+# Benchmark: lädt die CSVs von BASE_URL (im Projekt-Repository auf GitHub, nicht in diesem Checkout);
+# mit SCHULDATEN_DIR / --dir aus einem Ordner mit lokalen Kopien
+#   python Streamlit/modules/schuldaten.py
+#   python Streamlit/modules/schuldaten.py --dir <Ordner mit den drei 21111-CSVs>
+BACKEND = os.environ.get("DASHBOARD_BACKEND") or ("polars" if pl is not None else "pandas")
+
+BASE_URL = "https://raw.githubusercontent.com/Antonijatzele/DSI_Abschlussprojekt/refs/heads/main/Daten/Integration/Bildungsintegration/"
+SCHULEN = "Destatis_21111-03_allgemeinbildende_schulen_2021_2024_zusammengefuegt.csv"
+HERKUNFT = "Destatis_21111-08_allgemeinbildende_schulen_2021_2024_zusammengefuegt.csv"
+ABSCHLUESSE = "Destatis_21111-12_allgemeinbildende_schulen_2021_2023_zusammengefuegt.csv"
+
+GESCHLECHTER = ["männlich", "weiblich"]
+STAATSANGEHOERIGKEITEN = ["deutsche Schüler/innen", "ausländische Schüler/innen"]
+AUSL = "auslaendische_Absolvierende_und_Abgehende_Anzahl"
+GESAMT = "Absolvierende_und_Abgehende_Anzahl"
+
+
+# Vorbereitete Datensätze als pandas (für Anzeige und Auswahllisten), Kopie je Aufruf
+@st.cache_data(show_spinner=False)
+def schulen():
+    return _to_pandas(_frame(SCHULEN))
+
+
+@st.cache_data(show_spinner=False)
+def herkunft():
+    return _to_pandas(_frame(HERKUNFT))
+
+
+@st.cache_data(show_spinner=False)
+def abschluesse():
+    return _to_pandas(_frame(ABSCHLUESSE))
+
+
+# Schularten nach Anteil ausländischer Schüler/innen (Schuljahr 2023/24), absteigend
+@st.cache_data(show_spinner=False)
+def schulart_ranking():
+    return _run(schulart_ranking_pandas, schulart_ranking_polars, _frame(SCHULEN))
+
+
+# Anteil ausländischer Schüler/innen je Schulart für die Auswahl (Diagramm 2)
+@st.cache_data(show_spinner=False)
+def schulart_anteile(jahr, bildungsbereich, bundesland):
+    return _run(schulart_anteile_pandas, schulart_anteile_polars, _frame(SCHULEN), jahr, bildungsbereich, bundesland)
+
+
+# Anzahl ausländischer Schüler/innen je Jahr für die 10 häufigsten Herkunftsländer der Auswahl
+@st.cache_data(show_spinner=False)
+def herkunft_verlauf(schularten, bundeslaender):
+    return _run(herkunft_verlauf_pandas, herkunft_verlauf_polars, _frame(HERKUNFT), schularten, bundeslaender)
+
+
+# Absolvierende je Abschluss mit Anteilen (Deutsche/Ausländer jeweils auf 100 % normiert)
+@st.cache_data(show_spinner=False)
+def abschluss_anteile(jahr):
+    return _run(abschluss_anteile_pandas, abschluss_anteile_polars, _frame(ABSCHLUESSE), jahr)
+
+
+# Vorbereiteter Datensatz im Format des Backends, einmal je Prozess (wird nicht verändert)
+@st.cache_resource(show_spinner=False)
+def _frame(name, backend=None):
+    backend = backend or BACKEND
+    if backend == "polars" and pl is None:
+        raise ImportError("DASHBOARD_BACKEND=polars, aber polars ist nicht installiert (pip install polars)")
+    prepare = PREPARE[name][backend == "polars"]
+    return prepare(_rohdaten(name))
+
+
+@st.cache_data(show_spinner=False)
+def _rohdaten(name):
+    return _lies(name)
+
+
+def _lies(name):
+    local = os.environ.get("SCHULDATEN_DIR")
+    if local:
+        return (Path(local) / name).read_bytes()
+    response = requests.get(BASE_URL + name, timeout=120)
+    response.raise_for_status()
+    return response.content
+
+
+def _run(pandas_chain, polars_chain, df, *args):
+    if pl is not None and isinstance(df, pl.DataFrame):
+        result = polars_chain(df, *args)
+        return result.to_pandas() if isinstance(result, pl.DataFrame) else result
+    return pandas_chain(df, *args)
+
+
+def _to_pandas(df):
+    return df.to_pandas() if pl is not None and isinstance(df, pl.DataFrame) else df.copy()
+
+
+################################
+# pandas (bisherige Schritte)  #
+################################
+
+def prepare_schulen_pandas(raw):
+    df = pd.read_csv(io.BytesIO(raw), sep=',')
+    df = df.drop(columns=['Staatsangehoerigkeit'])
+    df = df.rename(columns={'Staatsangehoerigkeit_clean': 'Staatsangehoerigkeit'})
+    df = df[df['Bildungsbereich'] != 'Bereich unbekannt']
+    df = df[~df['Bildungsbereich'].isin(['Ohne Zuordnung', 'Vorschulbereich'])]
+    return df
+
+
+def schulart_ranking_pandas(df):
+    df_temp = df[
+        (df['Geschlecht'].isin(GESCHLECHTER)) &
+        (df['Bundesland'] != 'Deutschland') &
+        (df['Schuljahr'] == "2023/24") &
+        (df['Staatsangehoerigkeit'].isin(STAATSANGEHOERIGKEITEN))
+        ]
+    if "Schulart" not in df_temp.columns:
+        return []
+
+    pivot_schulart = df_temp.pivot_table(
+        index='Schulart',
+        columns='Staatsangehoerigkeit',
+        values='Schueler_innen_Anzahl',
+        aggfunc='sum',
+        fill_value=0
+    )
+    pivot_schulart['gesamt'] = pivot_schulart['deutsche Schüler/innen'] + pivot_schulart['ausländische Schüler/innen']
+    pivot_schulart['anteil_auslaendisch'] = (pivot_schulart['ausländische Schüler/innen'] / pivot_schulart['gesamt']) * 100
+    return pivot_schulart.sort_values(by='anteil_auslaendisch', ascending=False, kind='stable').index.tolist()
+
+
+def schulart_anteile_pandas(df, jahr, bildungsbereich, bundesland):
+    df_filtered = df[
+        (df['Geschlecht'].isin(GESCHLECHTER)) &
+        (df['Bundesland'] != 'Deutschland') &
+        (df['Schuljahr'] == jahr) &
+        (df['Staatsangehoerigkeit'].isin(STAATSANGEHOERIGKEITEN)) &
+        (df['Bildungsbereich'] == bildungsbereich)
+        ]
+    if bundesland != 'Deutschland':
+        df_filtered = df_filtered[df_filtered['Bundesland'] == bundesland]
+
+    df_filtered = df_filtered[df_filtered['Schulart'].notna()]
+    df_filtered = df_filtered[~df_filtered['Schulart'].isin(['Insgesamt', 'Keine Zuordnung zu einer Schulart möglich'])]
+
+    df_gesamt = df_filtered.groupby(['Schuljahr', 'Schulart'])['Schueler_innen_Anzahl'].sum().reset_index()
+    df_gesamt = df_gesamt.rename(columns={'Schueler_innen_Anzahl': 'Gesamt'})
+
+    df_auslaender = df_filtered[df_filtered['Staatsangehoerigkeit'] == 'ausländische Schüler/innen']
+    df_auslaender = df_auslaender.groupby(['Schuljahr', 'Schulart'])['Schueler_innen_Anzahl'].sum().reset_index()
+    df_auslaender = df_auslaender.rename(columns={'Schueler_innen_Anzahl': 'Auslaendisch'})
+
+    df_plot = pd.merge(df_auslaender, df_gesamt, on=['Schuljahr', 'Schulart'])
+    df_plot['Anteil'] = df_plot['Auslaendisch'] / df_plot['Gesamt'] * 100
+    return df_plot
+
+
+def prepare_herkunft_pandas(raw):
+    df = pd.read_csv(io.BytesIO(raw), sep=',')
+    df = df[df["Geschlecht"] != "Insgesamt"]
+    df = df.drop(df.columns[:2], axis=1)
+    df['Staatsangehoerigkeit'] = df['Staatsangehoerigkeit'].replace('Syrien, Arabische Republik', 'Syrien')
+    df = df[df['Bundesland'] != 'Deutschland']
+    df = df[(df['Schulart'] != 'Insgesamt') & (df['Staatsangehoerigkeit'] != 'Insgesamt')]
+    return df
+
+
+def herkunft_verlauf_pandas(df, schularten, bundeslaender):
+    df = df.assign(Jahr=df['Schuljahr'].str[:4].astype(int))
+    df_plot_filtered = df[df['Staatsangehoerigkeit'] != "Insgesamt"]
+    if "Alle" not in schularten:
+        df_plot_filtered = df_plot_filtered[df_plot_filtered['Schulart'].isin(schularten)]
+    if "Alle" not in bundeslaender:
+        df_plot_filtered = df_plot_filtered[df_plot_filtered['Bundesland'].isin(bundeslaender)]
+
+    df_grouped_plot = df_plot_filtered.groupby(['Jahr', 'Staatsangehoerigkeit'], as_index=False)[
+        'auslaendische_Schueler_innen_Anzahl'].sum()
+    top10_laender = (
+        df_grouped_plot
+        .groupby('Staatsangehoerigkeit')['auslaendische_Schueler_innen_Anzahl']
+        .sum()
+        .nlargest(10)
+        .index
+    )
+    return df_grouped_plot[df_grouped_plot['Staatsangehoerigkeit'].isin(top10_laender)].reset_index(drop=True)
+
+
+def prepare_abschluesse_pandas(raw):
+    df = pd.read_csv(io.BytesIO(raw), sep=';')
+    df = df.drop(df.columns[:2], axis=1)
+    df = df.rename(columns={'auslaendische_Absolvierende_und_Abgehende _Anzahl': AUSL})
+    df[GESAMT] = pd.to_numeric(df[GESAMT], errors='coerce')
+    df[AUSL] = pd.to_numeric(df[AUSL], errors='coerce')
+    df['Abschluss'] = df['Abschluss'].replace('mittlerer Abschluss', 'Mittlerer Abschluss')
+    df.loc[df['Abschluss2'] == 'dar.: mit schulischem Teil der Fachhochschulreife', 'Abschluss'] = 'Fachhochschulreife'
+    return df
+
+
+def abschluss_anteile_pandas(df, jahr):
+    df_filtered_12 = df[df['Abgangsjahr'] == jahr]
+    grouped = df_filtered_12.groupby("Abschluss").agg({GESAMT: "sum", AUSL: "sum"}).reset_index()
+
+    sum_auslaender = grouped[AUSL].sum()
+    sum_deutsch = grouped[GESAMT].sum() - sum_auslaender
+    grouped["auslaender_prozent_norm"] = grouped[AUSL] / sum_auslaender * 100
+    grouped["deutsch_anzahl"] = grouped[GESAMT] - grouped[AUSL]
+    grouped["deutsch_prozent_norm"] = grouped["deutsch_anzahl"] / sum_deutsch * 100
+    return grouped.sort_values(by="auslaender_prozent_norm", ascending=False, kind='stable').reset_index(drop=True)
+
+
+###########################
+# polars (LazyFrame)      #
+###########################
+# Vergleiche wie in pandas: fehlende Werte sind bei "!=" / "not in" enthalten, bei "==" / "in" nicht
+
+def _ne(col, value):
+    return pl.col(col).ne_missing(value)
+
+
+def _eq(col, value):
+    return pl.col(col).eq_missing(value)
+
+
+def _in(col, values):
+    return pl.col(col).is_in(list(values)).fill_null(False)
+
+
+def prepare_schulen_polars(raw):
+    return (
+        pl.read_csv(raw, separator=",", infer_schema_length=None).lazy()
+        .drop("Staatsangehoerigkeit")
+        .rename({"Staatsangehoerigkeit_clean": "Staatsangehoerigkeit"})
+        .filter(_ne("Bildungsbereich", "Bereich unbekannt") & ~_in("Bildungsbereich", ["Ohne Zuordnung", "Vorschulbereich"]))
+        .collect()
+    )
+
+
+def schulart_ranking_polars(df):
+    if "Schulart" not in df.columns:
+        return []
+    anzahl = pl.col("Schueler_innen_Anzahl")
+    return (
+        df.lazy()
+        .filter(
+            _in("Geschlecht", GESCHLECHTER) & _ne("Bundesland", "Deutschland")
+            & _eq("Schuljahr", "2023/24") & _in("Staatsangehoerigkeit", STAATSANGEHOERIGKEITEN)
+            & pl.col("Schulart").is_not_null()
+        )
+        .group_by("Schulart")
+        .agg(
+            anzahl.filter(pl.col("Staatsangehoerigkeit") == "deutsche Schüler/innen").sum().alias("deutsch"),
+            anzahl.filter(pl.col("Staatsangehoerigkeit") == "ausländische Schüler/innen").sum().alias("auslaendisch"),
+        )
+        .with_columns((pl.col("auslaendisch") / (pl.col("deutsch") + pl.col("auslaendisch")) * 100).alias("anteil"))
+        .sort("Schulart")
+        .sort("anteil", descending=True, nulls_last=True, maintain_order=True)
+        .collect()
+        .get_column("Schulart")
+        .to_list()
+    )
+
+
+def schulart_anteile_polars(df, jahr, bildungsbereich, bundesland):
+    anzahl = pl.col("Schueler_innen_Anzahl")
+    ausl = pl.col("Staatsangehoerigkeit") == "ausländische Schüler/innen"
+    lf = df.lazy().filter(
+        _in("Geschlecht", GESCHLECHTER) & _ne("Bundesland", "Deutschland") & _eq("Schuljahr", jahr)
+        & _in("Staatsangehoerigkeit", STAATSANGEHOERIGKEITEN) & _eq("Bildungsbereich", bildungsbereich)
+        & pl.col("Schulart").is_not_null()
+        & ~_in("Schulart", ["Insgesamt", "Keine Zuordnung zu einer Schulart möglich"])
+    )
+    if bundesland != "Deutschland":
+        lf = lf.filter(_eq("Bundesland", bundesland))
+
+    return (
+        lf.filter(pl.col("Schuljahr").is_not_null())
+        .group_by(["Schuljahr", "Schulart"])
+        .agg(
+            anzahl.filter(ausl).sum().alias("Auslaendisch"),
+            anzahl.sum().alias("Gesamt"),
+            ausl.any().alias("_ausl"),
+        )
+        .filter(pl.col("_ausl"))
+        .drop("_ausl")
+        .with_columns((pl.col("Auslaendisch") / pl.col("Gesamt") * 100).alias("Anteil"))
+        .sort(["Schuljahr", "Schulart"])
+        .collect()
+    )
+
+
+def prepare_herkunft_polars(raw):
+    df = pl.read_csv(raw, separator=",", infer_schema_length=None)
+    return (
+        df.lazy()
+        .filter(_ne("Geschlecht", "Insgesamt"))
+        .select(df.columns[2:])
+        .with_columns(pl.col("Staatsangehoerigkeit").replace("Syrien, Arabische Republik", "Syrien"))
+        .filter(
+            _ne("Bundesland", "Deutschland") & _ne("Schulart", "Insgesamt") & _ne("Staatsangehoerigkeit", "Insgesamt")
+        )
+        .collect()
+    )
+
+
+def herkunft_verlauf_polars(df, schularten, bundeslaender):
+    anzahl = "auslaendische_Schueler_innen_Anzahl"
+    lf = (
+        df.lazy()
+        .with_columns(pl.col("Schuljahr").str.slice(0, 4).cast(pl.Int64).alias("Jahr"))
+        .filter(_ne("Staatsangehoerigkeit", "Insgesamt") & pl.col("Staatsangehoerigkeit").is_not_null())
+    )
+    if "Alle" not in schularten:
+        lf = lf.filter(_in("Schulart", schularten))
+    if "Alle" not in bundeslaender:
+        lf = lf.filter(_in("Bundesland", bundeslaender))
+
+    grouped = lf.group_by(["Jahr", "Staatsangehoerigkeit"]).agg(pl.col(anzahl).sum())
+    top10 = (
+        grouped.group_by("Staatsangehoerigkeit").agg(pl.col(anzahl).sum())
+        .sort("Staatsangehoerigkeit")
+        .sort(anzahl, descending=True, maintain_order=True)
+        .head(10)
+        .select("Staatsangehoerigkeit")
+    )
+    return grouped.join(top10, on="Staatsangehoerigkeit", how="semi").sort(["Jahr", "Staatsangehoerigkeit"]).collect()
+
+
+def prepare_abschluesse_polars(raw):
+    df = pl.read_csv(raw, separator=";", infer_schema_length=None)
+    df = df.select(df.columns[2:])
+    if "auslaendische_Absolvierende_und_Abgehende _Anzahl" in df.columns:
+        df = df.rename({"auslaendische_Absolvierende_und_Abgehende _Anzahl": AUSL})
+    fhr = pl.col("Abschluss2").eq_missing("dar.: mit schulischem Teil der Fachhochschulreife")
+    return (
+        df.lazy()
+        .with_columns(
+            _numeric(df, GESAMT),
+            _numeric(df, AUSL),
+            pl.when(fhr).then(pl.lit("Fachhochschulreife"))
+            .otherwise(pl.col("Abschluss").replace("mittlerer Abschluss", "Mittlerer Abschluss"))
+            .alias("Abschluss"),
+        )
+        .collect()
+    )
+
+
+# wie pd.to_numeric(errors="coerce"): Zahlen bleiben, nicht lesbare Texte werden fehlend
+def _numeric(df, col):
+    if df.schema[col].is_numeric():
+        return pl.col(col)
+    return pl.col(col).str.strip_chars().cast(pl.Float64, strict=False)
+
+
+def abschluss_anteile_polars(df, jahr):
+    return (
+        df.lazy()
+        .filter(_eq("Abgangsjahr", jahr) & pl.col("Abschluss").is_not_null())
+        .group_by("Abschluss")
+        .agg(pl.col(GESAMT).sum(), pl.col(AUSL).sum())
+        .with_columns((pl.col(AUSL) / pl.col(AUSL).sum() * 100).alias("auslaender_prozent_norm"))
+        .with_columns((pl.col(GESAMT) - pl.col(AUSL)).alias("deutsch_anzahl"))
+        .with_columns((pl.col("deutsch_anzahl") / pl.col("deutsch_anzahl").sum() * 100).alias("deutsch_prozent_norm"))
+        .sort("Abschluss")
+        .sort("auslaender_prozent_norm", descending=True, nulls_last=True, maintain_order=True)
+        .collect()
+    )
+
+
+# Vorbereitung je Datei: (pandas, polars)
+PREPARE = {
+    SCHULEN: (prepare_schulen_pandas, prepare_schulen_polars),
+    HERKUNFT: (prepare_herkunft_pandas, prepare_herkunft_polars),
+    ABSCHLUESSE: (prepare_abschluesse_pandas, prepare_abschluesse_polars),
+}
+
+
+# Je Backend: Vorbereitung (einmal je Prozess) und die Ketten der Seite (bei jeder Auswahl),
+# jeweils bestes von repeat Läufen, ohne Download
+def benchmark(repeat=5):
+    raw = {name: _lies(name) for name in PREPARE}
+    backends = ["pandas"] + (["polars"] if pl is not None else [])
+
+    def prepare(backend):
+        return {name: PREPARE[name][backend == "polars"](raw[name]) for name in PREPARE}
+
+    def chains(frames):
+        schulen_df, herkunft_df, abschluesse_df = frames[SCHULEN], frames[HERKUNFT], frames[ABSCHLUESSE]
+        bereich = _first(schulen_df, "Bildungsbereich")
+        abgangsjahr = _first(abschluesse_df, "Abgangsjahr")
+        return {
+            "21111-03 Ranking": _run(schulart_ranking_pandas, schulart_ranking_polars, schulen_df),
+            "21111-03 Anteile": _run(schulart_anteile_pandas, schulart_anteile_polars, schulen_df, "2023/24", bereich, "Deutschland"),
+            "21111-08 Verlauf": _run(herkunft_verlauf_pandas, herkunft_verlauf_polars, herkunft_df, ["Alle"], ["Alle"]),
+            "21111-12 Anteile": _run(abschluss_anteile_pandas, abschluss_anteile_polars, abschluesse_df, abgangsjahr),
+        }
+
+    def best(func, *args):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(*args)
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    timings, results = {}, {}
+    print(f"{'Backend':8} {'Vorbereitung':>13} {'Ketten':>10}")
+    for backend in backends:
+        t_prepare, frames = best(prepare, backend)
+        t_chains, results[backend] = best(chains, frames)
+        timings[backend] = (t_prepare, t_chains)
+        print(f"{backend:8} {t_prepare * 1000:11.1f}ms {t_chains * 1000:8.1f}ms")
+
+    if "polars" in timings:
+        (p_pd, c_pd), (p_pl, c_pl) = timings["pandas"], timings["polars"]
+        print(f"Beschleunigung: Vorbereitung {p_pd / p_pl:.1f}x, Ketten {c_pd / c_pl:.1f}x (polars-Threads: {pl.thread_pool_size()})")
+        for key, expected in results["pandas"].items():
+            actual = results["polars"][key]
+            if isinstance(expected, pd.DataFrame):
+                pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+            elif actual != expected:
+                raise AssertionError(f"{key}: {actual} != {expected}")
+        print("Ergebnisse beider Backends stimmen überein")
+    return timings
+
+
+def _first(df, col):
+    values = df[col].drop_nulls() if pl is not None and isinstance(df, pl.DataFrame) else df[col].dropna()
+    return sorted(values.unique())[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vergleicht pandas und polars für die Schul-Datensätze 21111-03/-08/-12")
+    parser.add_argument("--dir", help="Ordner mit lokalen Kopien der CSV-Dateien (sonst Download)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.dir:
+        os.environ["SCHULDATEN_DIR"] = args.dir
+    benchmark(args.repeat)